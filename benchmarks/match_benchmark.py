@@ -0,0 +1,207 @@
+"""Offline benchmark of the /find match pipeline on synthetic guilds.
+
+Builds fake guilds whose members carry realistic role mixes (the matchmaking
+roles from MatchSySystems plus the other self roles of configs/roles/RolesID.json),
+then times profile decoding, scoring and selection for random requesters.
+
+Usage:
+    python -m benchmarks.match_benchmark
+    python -m benchmarks.match_benchmark --sizes 1000 10000 --queries 100 --reference
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cogs.match import MatchSySystems
+from utilities.match_scoring import rank_tiers, pick_from_tiers
+
+GUILD_ID = 1349136661971206268
+ROLES_FILE = os.path.join(ROOT, "configs", "roles", "RolesID.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Share of members holding a role of each single-choice category and the
+# relative weight of each value (values not listed are weighted 1)
+CATEGORY_FILL = {
+    "Gender": (0.95, {"male": 55, "female": 45}),
+    "Relationship Status": (0.85, {"single": 60, "taken": 15, "complicated": 10, "not looking": 15}),
+    "Dms Status": (0.85, {"dms open": 45, "dms closed": 20, "dms ask": 35}),
+    "Height Preference": (0.6, {}),
+    "Age Preference": (0.7, {}),
+    "Distance Preference": (0.6, {}),
+}
+TABLE_FILL = {"age": 0.9, "height": 0.6, "region": 0.8}
+# (min, max) number of roles held in multi-choice categories
+MULTI_RANGE = {"personality": (0, 3), "Personality Preference": (0, 4), "Hobbies and Interests": (0, 5)}
+# (min, max) number of unrelated self roles (colors, occupations, ...)
+NOISE_RANGE = (2, 8)
+
+
+class FakeLoop:
+    """Loop stand-in for the cog constructor; the match history is not benchmarked"""
+
+    @staticmethod
+    def create_task(coro):
+        coro.close()
+
+
+def noise_roles(cog):
+    """Role IDs of RolesID.json that the matcher does not decode"""
+    with open(ROLES_FILE, "r") as f:
+        data = json.load(f).get(str(GUILD_ID), {})
+    ids = []
+    for value in data.values():
+        ids.extend(value.values() if isinstance(value, dict) else [value])
+    return [role_id for role_id in set(ids) if role_id not in cog.role_index]
+
+
+def weighted_pick(rng, options, weights):
+    return rng.choices(list(options), weights=[weights.get(key, 1) for key in options])[0]
+
+
+def make_guild(cog, size, rng):
+    """Build a fake guild with `size` members"""
+    noise = noise_roles(cog)
+    guild = SimpleNamespace(id=GUILD_ID, members=[])
+    tables = {"age": cog.age_roles, "height": cog.height_roles, "region": cog.region}
+    for member_id in range(1, size + 1):
+        roles = []
+        for category, (fill, weights) in CATEGORY_FILL.items():
+            if rng.random() < fill:
+                options = cog.category_weights[category]["roles"]
+                roles.append(options[weighted_pick(rng, options, weights)])
+        for name, fill in TABLE_FILL.items():
+            if rng.random() < fill:
+                roles.append(rng.choice(list(tables[name].values())))
+        for category, (low, high) in MULTI_RANGE.items():
+            options = cog.personality if category == "personality" else cog.category_weights[category]["roles"]
+            roles.extend(rng.sample(list(options.values()), rng.randint(low, high)))
+        roles.extend(rng.sample(noise, min(len(noise), rng.randint(*NOISE_RANGE))))
+        rng.shuffle(roles)
+        guild.members.append(SimpleNamespace(
+            id=member_id,
+            bot=False,
+            guild=guild,
+            roles=[SimpleNamespace(id=role_id) for role_id in roles]
+        ))
+    return guild
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def run_size(size, queries, seed, reference):
+    rng = random.Random(seed)
+    random.seed(seed)
+    cog = MatchSySystems(SimpleNamespace(guilds=[], loop=FakeLoop()))
+    guild = make_guild(cog, size, rng)
+
+    start = time.perf_counter()
+    cog.profiles.load_guild(guild)
+    build = time.perf_counter() - start
+
+    stages = {"decode": [], "score": [], "select": [], "total": []}
+    reference_times = []
+    for _ in range(queries):
+        requester = rng.choice(guild.members)
+        gender = rng.choice(["male", "female"])
+        excluded = {requester.id}
+
+        t0 = time.perf_counter()
+        user_data = cog.extract_user_data(requester)
+        t1 = time.perf_counter()
+        columns = cog.profiles.candidates(guild.id, gender)
+        tiers = rank_tiers(cog.scorer, user_data, columns, cog.match_depth)
+        t2 = time.perf_counter()
+        pick_from_tiers(tiers, excluded, 1)
+        t3 = time.perf_counter()
+
+        stages["decode"].append(t1 - t0)
+        stages["score"].append(t2 - t1)
+        stages["select"].append(t3 - t2)
+        stages["total"].append(t3 - t0)
+
+        if reference:
+            t0 = time.perf_counter()
+            for member_id in columns.member_ids.tolist():
+                cog.compare_users(user_data, cog.profiles.get(guild.id, member_id))
+            reference_times.append(time.perf_counter() - t0)
+
+    # Peak memory is measured on a separate rebuild so tracing does not skew the timings
+    tracemalloc.start()
+    cog.profiles.load_guild(guild)
+    for gender in ("male", "female"):
+        rank_tiers(cog.scorer, user_data, cog.profiles.candidates(guild.id, gender), cog.match_depth)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "members": size,
+        "queries": queries,
+        "build_ms": round(build * 1000, 3),
+        "stages": {name: percentiles(samples) for name, samples in stages.items()},
+        "peak_memory_mb": round(peak / (1024 * 1024), 3),
+    }
+    if reference_times:
+        result["reference_compare_users"] = percentiles(reference_times)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /find match pipeline on synthetic guilds.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Guild sizes to benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Match queries per guild size")
+    parser.add_argument("--seed", type=int, default=665, help="Random seed")
+    parser.add_argument("--reference", action="store_true", help="Also time the per-pair compare_users loop")
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/match-<commit>.json)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    for size in args.sizes:
+        result = run_size(size, args.queries, args.seed, args.reference)
+        report["results"].append(result)
+        total = result["stages"]["total"]
+        print(f"{size:>7} members: build {result['build_ms']:.1f} ms, query p50 {total['p50_ms']:.3f} ms, "
+              f"p99 {total['p99_ms']:.3f} ms, peak {result['peak_memory_mb']:.1f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"match-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
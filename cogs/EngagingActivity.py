@@ -8,6 +8,7 @@ from errors.error_logger import error_send
 import time
 import asyncio
 from discord.ui import View, button, Button
+from utilities.message_router import MessageRouter, message_handler
 
 
 class TruthOrDareView(View):
@@ -52,6 +53,9 @@ class TruthOrDareView(View):
 
 
 class EngageActivity(commands.Cog):
+    # Messages containing one of these get a heart reaction
+    triggers = ["welcome", "wlc", "love you", "luv u", "luv you"]
+
     def __init__(self, bot):
         self.bot = bot 
         self.post_channel = 1349150427106508821
@@ -60,6 +64,12 @@ class EngageActivity(commands.Cog):
         # Games
         self.trivi_games = {}
         self.duration = 60
+    
+    async def cog_load(self):
+        MessageRouter().add_cog(self)
+    
+    async def cog_unload(self):
+        MessageRouter().remove_cog(self)
         
     def get_question(self, file_path):
         # Load questions data
@@ -252,42 +262,37 @@ class EngageActivity(commands.Cog):
         except Exception:
             await error_send()
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return 
+    # Auto react to triggers
+    @message_handler(contains=triggers, guild_only=False)
+    async def react_to_triggers(self, ctx):
+        try:
+            reactions = [
+                self.emojis["redglassheart"],
+                self.emojis["PinkHearts"],
+                self.emojis["blowingHearts"],
+                self.emojis["TwoHearts"],
+                self.emojis["HeartMessage"],
+                self.emojis["PurpleHearts"],
+                self.emojis["Heartribbon"],
+                self.emojis["Heartspin"],
+                self.emojis["CatHeart"],
+                self.emojis["BlackCatHeart"],
+                self.emojis["LikeHeart"],
+            ]
+            reaction = random.choice(reactions)
+            try: 
+                await ctx.message.add_reaction(reaction)
+            except discord.NotFound:
+                pass
+            except discord.Forbidden:
+                pass
+        except Exception:
+            await error_send()
+    
+    # add random reaction to messages 
+    @message_handler(guild_only=False)
+    async def random_reaction(self, ctx):
         try:
-            # Auto react to triggers
-            triggers = ["welcome", "wlc", "love you", "luv u", "luv you"]
-            is_triggered = False
-            for trigger in triggers:
-                if trigger in message.content:
-                    is_triggered = True
-            if is_triggered:
-                reactions = [
-                    self.emojis["redglassheart"],
-                    self.emojis["PinkHearts"],
-                    self.emojis["blowingHearts"],
-                    self.emojis["TwoHearts"],
-                    self.emojis["HeartMessage"],
-                    self.emojis["PurpleHearts"],
-                    self.emojis["Heartribbon"],
-                    self.emojis["Heartspin"],
-                    self.emojis["CatHeart"],
-                    self.emojis["BlackCatHeart"],
-                    self.emojis["LikeHeart"],
-                ]
-                reaction = random.choice(reactions)
-                try: 
-                    await message.add_reaction(reaction)
-                except discord.NotFound:
-                    pass
-                except discord.Forbidden:
-                    pass
-                except Exception:
-                    await error_send()
-            
-            # add random reaction to messages 
             react = random.choices(
                 [True, False],
                 weights=[0.02, 0.98],
@@ -295,7 +300,7 @@ class EngageActivity(commands.Cog):
             )[0]
             if react:
                 emojis = ["💀", "😭", "😶‍🌫️", "🤡", "😩", "😵‍💫", "😹", "🤣", "🙃", "😈", "👀", "🥴", "😵", "😬", "😳", "😤", "🗿", "😛", "😒", "😔", "💅", "🧍", "🧎", "😎", "🤓"]
-                await message.add_reaction(random.choice(emojis))
+                await ctx.message.add_reaction(random.choice(emojis))
         except Exception:
             await error_send()
     
@@ -4,25 +4,40 @@ from discord import app_commands
 from errors.error_logger import error_send 
 from utilities import Permissions
 from utilities.database import Database
-from typing import List
+from utilities.message_router import MessageRouter, message_handler
+from typing import Any, Dict, List
 
 class Thread(commands.Cog):
     def __init__(self, bot):
         self.bot = bot 
+        # Guild ID (str) -> channel ID (str) -> thread settings, as stored
         self.thread_channels = {}
+        # Channel ID -> thread settings of every auto-threaded channel
+        self.channel_configs: Dict[int, Dict[str, Any]] = {}
         self.db = Database()
-        self.bot.loop.create_task(self._modtable_())
+        self._loading = self.bot.loop.create_task(self._modtable_())
+        
+    async def cog_load(self):
+        MessageRouter().add_cog(self)
         
     async def cog_unload(self):
-        """No cleanup needed as Database class manages its own connections"""
-        pass
+        """Unregister the message handlers; the Database class manages its own connections"""
+        MessageRouter().remove_cog(self)
         
     async def _modtable_(self):
-        """Initialize the database table for threading"""
-        await self.db.create_table("threading", """
-            guild_id INTEGER PRIMARY KEY,
-            thread_channel TEXT
-        """)
+        """Initialize the database table for threading and load every guild's channels"""
+        await self.db.ensure_schema()
+        for guild_id, channels in (await self.db.get_all_auto_thread_channels()).items():
+            self.thread_channels[str(guild_id)] = channels
+        self._reindex()
+
+    def _reindex(self):
+        """Rebuild the channel lookup from the per-guild configuration"""
+        self.channel_configs = {
+            int(channel_id): config
+            for channels in self.thread_channels.values()
+            for channel_id, config in channels.items()
+        }
 
     # auto threading 
     async def save_thread_channels(self, guild_id):
@@ -34,11 +49,7 @@ class Thread(commands.Cog):
             "thread_channel", 
             self.thread_channels.get(str(guild_id), {})
         )
-            
-    async def get_auto_thread_channels(self, guild_id):
-        """Get thread channel configuration from database"""
-        thread_channels = await self.db.get_auto_thread_channels(guild_id)
-        self.thread_channels[str(guild_id)] = thread_channels
+        self._reindex()
     
     async def check_perm(self, interaction, user_perms: List, bot_perms: List, target: discord.Member = None):
         permissions = Permissions(interaction)
@@ -53,7 +64,7 @@ class Thread(commands.Cog):
             if not authorized:
                 return 
             
-            await self.get_auto_thread_channels(interaction.guild.id)
+            await self._loading
             thread_channel_config = {
                 "name": thread_name,
                 "first_message": first_message,
@@ -74,7 +85,7 @@ class Thread(commands.Cog):
             authorized = await self.check_perm(interaction, ["administrator"], ["create_public_threads"])
             if not authorized:
                 return 
-            await self.get_auto_thread_channels(interaction.guild.id)
+            await self._loading
             # Check if the channel exists in the stored thread channels
             guild_id = str(interaction.guild.id)
             if guild_id not in self.thread_channels or not self.thread_channels[guild_id]:
@@ -95,11 +106,9 @@ class Thread(commands.Cog):
         except Exception:
             await error_send(interaction)
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return 
-        
+    @message_handler()
+    async def on_guild_message(self, ctx):
+        message = ctx.message
         # Get command prefix
         prefixes = await self.bot.get_prefix(message)
         
@@ -110,16 +119,15 @@ class Thread(commands.Cog):
         if any(message.content.startswith(prefix) for prefix in prefixes):
             await message.delete()
             
-        guild_id = str(message.guild.id)
         try:
-            await self.get_auto_thread_channels(message.guild.id)
-            if guild_id not in self.thread_channels or not self.thread_channels[guild_id]:
-                return
-            if str(message.channel.id) not in self.thread_channels[guild_id]:
+            if not self._loading.done():
+                await self._loading
+            config = self.channel_configs.get(ctx.channel_id)
+            if config is None:
                 return
-            thread_name = self.thread_channels[guild_id][str(message.channel.id)].get("name", "")
-            first_message = self.thread_channels[guild_id][str(message.channel.id)].get("first_message", "")
-            media_only = self.thread_channels[guild_id][str(message.channel.id)].get("media_only", False)
+            thread_name = config.get("name", "")
+            first_message = config.get("first_message", "")
+            media_only = config.get("media_only", False)
             if media_only:
                 if not message.attachments:
                     await message.delete()
@@ -4,7 +4,7 @@ from discord import app_commands, Interaction, ui
 from utilities import colors
 from utilities import censor_text
 from errors.error_logger import error_send
-import sqlite3 
+from utilities.database import Database
 from datetime import datetime
 from utilities import Permissions
 
@@ -12,16 +12,11 @@ from utilities import Permissions
 class ConfessModal(ui.Modal, title="Anonymous Confession"):
     def __init__(self):
         super().__init__()
-        self.conn = sqlite3.connect("database/data.db")
+        self.db = Database()
     
  
-    def save_confession(self, message_id, user_id, content):
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("INSERT INTO confessions (message_id, user_id, content) VALUES (?, ?, ?)", (message_id, user_id, content))
-            self.conn.commit()
-        finally:
-            cursor.close()
+    async def save_confession(self, message_id, user_id, content):
+        await self.db.insert("confessions", {"message_id": message_id, "user_id": user_id, "content": content})
     
     confession = ui.TextInput(label="Your Confession", style=discord.TextStyle.paragraph, required=True, max_length=1000)
 
@@ -40,7 +35,7 @@ class ConfessModal(ui.Modal, title="Anonymous Confession"):
             )
             view = ConfessButton()
             message = await channel.send(embed=embed, view=view)
-            self.save_confession(message.id, interaction.user.id, text_input)
+            await self.save_confession(message.id, interaction.user.id, text_input)
             thread = await message.create_thread(
                 name="Comments",
                 auto_archive_duration=1440
@@ -80,15 +75,11 @@ class DeleteButton(ui.View):
 class ConfessButton(ui.View):
     def __init__(self):
         super().__init__(timeout=None)
-        self.conn = sqlite3.connect("database/data.db")
+        self.db = Database()
     
-    def get_confession_data(self, message_id):
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("SELECT user_id, content FROM confessions WHERE message_id = ?", (message_id,))
-            return cursor.fetchone()
-        finally:
-            cursor.close()
+    async def get_confession_data(self, message_id):
+        row = await self.db.fetchone("SELECT user_id, content FROM confessions WHERE message_id = ?", (message_id,))
+        return (row["user_id"], row["content"]) if row else None
             
     @ui.button(label="Confess", style=discord.ButtonStyle.primary, custom_id="confess")
     async def confess(self, interaction: Interaction, button: discord.Button):
@@ -99,7 +90,7 @@ class ConfessButton(ui.View):
     async def Report(self, interaction: Interaction, button: discord.Button):
         try:
             await interaction.response.defer(ephemeral=True)
-            data = self.get_confession_data(interaction.message.id)
+            data = await self.get_confession_data(interaction.message.id)
             user_id, content = data
             report_embed = discord.Embed(
                 title="Reported Confess Message",
@@ -142,22 +133,11 @@ class ConfessButton(ui.View):
 class Confessions(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.conn = sqlite3.connect("database/data.db")
-        self.db_init()
+        self.db = Database()
+        self.bot.loop.create_task(self.db_init())
     
-    def db_init(self):
-        cursor = self.conn.cursor()
-        try: 
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS confessions (
-                    message_id INTEGER PRIMARY KEY,
-                    user_id INTEGER NOT NULL,
-                    content TEXT NOT NULL
-                )
-            """)
-            self.conn.commit()
-        finally:
-            cursor.close()
+    async def db_init(self):
+        await self.db.ensure_schema()
     
     # Confessions commands group 
     group = app_commands.Group(name="confessions", description="Confessions related commands")
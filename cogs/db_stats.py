@@ -0,0 +1,105 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from utilities import Permissions, colors
+from utilities.database import Database
+from utilities.message_router import MessageRouter
+from errors.error_logger import error_send
+from datetime import datetime
+
+
+class DatabaseStats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = Database()
+
+    async def is_admin(self, interaction: discord.Interaction) -> bool:
+        return await Permissions(interaction).check_guild_permission(interaction.user, ["administrator"])
+
+    dbstats = app_commands.Group(name="dbstats", description="Database query statistics")
+
+    @dbstats.command(name="show", description="Show the queries that cost the most.")
+    @app_commands.describe(sort="What to rank the queries by.", limit="How many queries to show.")
+    @app_commands.choices(sort=[
+        app_commands.Choice(name="Execution time", value="exec_time"),
+        app_commands.Choice(name="Lock wait", value="lock_wait"),
+        app_commands.Choice(name="Count", value="count"),
+        app_commands.Choice(name="Rows", value="rows"),
+    ])
+    async def show(self, interaction: discord.Interaction, sort: str = "exec_time", limit: app_commands.Range[int, 1, 25] = 10):
+        try:
+            if not await self.is_admin(interaction):
+                return
+            stats = self.db.stats
+            status = "enabled" if stats.enabled else "disabled (`/dbstats enable`)"
+            since = datetime.fromtimestamp(stats.since).strftime("%Y-%m-%d %H:%M:%S")
+            report = stats.report(limit, sort, width=60)
+            embed = discord.Embed(
+                title="Database Queries",
+                description=f"Instrumentation {status}, {len(stats)} query templates since {since}\n```\n{report[:3800]}\n```",
+                color=colors.primary
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Exception:
+            await error_send(interaction)
+
+    @dbstats.command(name="slow", description="Show the latest slow queries and where they came from.")
+    async def slow(self, interaction: discord.Interaction):
+        try:
+            if not await self.is_admin(interaction):
+                return
+            stats = self.db.stats
+            lines = [
+                f"{datetime.fromtimestamp(at).strftime('%H:%M:%S')} {seconds * 1000:>7.1f} ms {caller}\n    {template[:100]}"
+                for at, seconds, caller, template in reversed(stats.slow_queries)
+            ]
+            description = "\n".join(lines) or f"No query slower than {stats.slow_threshold * 1000:.0f} ms."
+            embed = discord.Embed(title="Slow Queries", description=f"```\n{description[:3900]}\n```", color=colors.primary)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Exception:
+            await error_send(interaction)
+
+    @dbstats.command(name="enable", description="Turn query instrumentation on or off.")
+    @app_commands.describe(enabled="Record query statistics?", slow_ms="Log queries slower than this many milliseconds.")
+    async def enable(self, interaction: discord.Interaction, enabled: bool, slow_ms: app_commands.Range[int, 1, 60000] = None):
+        try:
+            if not await self.is_admin(interaction):
+                return
+            self.db.stats.enabled = enabled
+            if slow_ms is not None:
+                self.db.stats.slow_threshold = slow_ms / 1000
+            state = "enabled" if enabled else "disabled"
+            await interaction.response.send_message(f"Query instrumentation {state} (slow query threshold {self.db.stats.slow_threshold * 1000:.0f} ms).", ephemeral=True)
+        except Exception:
+            await error_send(interaction)
+
+    @dbstats.command(name="reset", description="Clear the recorded query statistics.")
+    async def reset(self, interaction: discord.Interaction):
+        try:
+            if not await self.is_admin(interaction):
+                return
+            self.db.stats.reset()
+            await interaction.response.send_message("Query statistics cleared.", ephemeral=True)
+        except Exception:
+            await error_send(interaction)
+
+    messages = app_commands.Group(name="messages", description="Message handler statistics")
+
+    @messages.command(name="stats", description="Show the latency of every message handler.")
+    async def message_stats(self, interaction: discord.Interaction):
+        try:
+            if not await self.is_admin(interaction):
+                return
+            router = MessageRouter()
+            embed = discord.Embed(
+                title="Message Handlers",
+                description=f"{len(router)} handlers registered\n```\n{router.report()[:3900]}\n```",
+                color=colors.primary
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        except Exception:
+            await error_send(interaction)
+
+
+async def setup(bot):
+    await bot.add_cog(DatabaseStats(bot))
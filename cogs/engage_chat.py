@@ -4,12 +4,14 @@ import time
 import random 
 from utilities import responses, colors
 from utilities.database import Database
+from utilities.user_settings import UserSettings
+from utilities.message_router import MessageRouter, message_handler
 
 
 class ButtonsUI(discord.ui.View):
     def __init__(self, channel_link, bot):
         super().__init__(timeout=None)
-        self.db = Database()
+        self.settings = UserSettings()
         self.bot = bot
         self.add_item(discord.ui.Button(
             label="Back to chat!", 
@@ -27,33 +29,11 @@ class ButtonsUI(discord.ui.View):
         self.add_item(self.block_button)
         
     async def update_settings(self, userid, new_value):
-        # Check if the user exists
-        exists = await self.db.fetchvalue(
-            "SELECT 1 FROM user_settings WHERE user_id = ?", 
-            (userid,)
-        )
-        
-        if exists:
-            # Update existing user
-            await self.db.update(
-                "user_settings",
-                {"dm_notif": new_value},
-                "user_id = ?",
-                (userid,)
-            )
-        else:
-            # Create new user
-            await self.db.insert(
-                "user_settings",
-                {"user_id": userid, "dm_notif": new_value}
-            )
+        await self.settings.set_dm_notif(userid, new_value)
 
     async def block_notification(self, interaction: discord.Interaction):
         user = interaction.user
-        notif_settings = await self.db.fetchvalue(
-            "SELECT dm_notif FROM user_settings WHERE user_id = ?",
-            (user.id,)
-        ) or "enabled"
+        notif_settings = await self.settings.get_dm_notif(user.id)
         
         if notif_settings == "enabled":
             await self.update_settings(user.id, "disabled")
@@ -64,39 +44,39 @@ class ButtonsUI(discord.ui.View):
 
 
 class Engage(commands.Cog):
+    boring_messages = [
+        "hi", "hey", "hello", "yo", "hmm"
+    ]
+
     def __init__(self, bot):
         self.bot = bot 
         self.db = Database()
+        self.settings = UserSettings(self.db)
         # We'll initialize the view in the setup method instead
-        self.boring_messages = [
-            "hi", "hey", "hello", "yo", "hmm"
-        ]
         self.boring_messages_count = {}
         self.last_boring_message_time = {}
         self.delay = 3600
         self.bot.loop.create_task(self.create_table())
    
     async def create_table(self):
-        await self.db.create_table("user_settings", """
-            user_id INTEGER PRIMARY KEY,
-            dm_notif TEXT
-        """)
+        await self.db.ensure_schema()
         # Initialize the view after the table is created
         self.bot.add_view(ButtonsUI("", self.bot))
+    
+    async def cog_load(self):
+        MessageRouter().add_cog(self)
+    
+    async def cog_unload(self):
+        MessageRouter().remove_cog(self)
        
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    # only boring messages get here
+    @message_handler(exact=boring_messages)
+    async def on_boring_message(self, ctx):
         try:
-            # check if it's a boring message
-            if message.content.lower() not in self.boring_messages:
-                return 
-            
-            user = message.author
+            message = ctx.message
+            user = ctx.author
             # is notif enabled for that user?
-            notif_settings = await self.db.fetchvalue(
-                "SELECT dm_notif FROM user_settings WHERE user_id = ?",
-                (user.id,)
-            ) or "enabled"
+            notif_settings = await self.settings.get_dm_notif(user.id)
             
             if notif_settings == "disabled":
                 return 
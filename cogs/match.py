@@ -2,6 +2,11 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from utilities import colors
+from utilities.match_profiles import ProfileStore
+from utilities.match_history import MatchHistory
+from utilities.database import Database
+from utilities.match_scoring import BatchScorer, ProfileEncoder, ScoringPool, rank_tiers, pick_from_tiers
+from utilities.match_cache import MatchCache
 from errors.error_logger import error_send
 import random 
 
@@ -154,11 +159,29 @@ class MatchSySystems(commands.Cog):
         # verified roles 
         self.verified_roles_id = [1350898361032642641,1350898277813583932]
         
-        # matches history
-        self.match_history = {}
-        
-        # Already matched user 
-        self.matched_users = []
+        # matches history (per requester and recently matched users), persisted
+        self.history = MatchHistory(Database())
+        self.bot.loop.create_task(self.history.load())
+
+        # Encoder of profile values; multi-choice categories are bitmasks
+        self.encoder = ProfileEncoder(self.category_weights, self.region, self.personality)
+        self.multi_value_fields = ('personality', 'personality_preference', 'hobbies')
+
+        # Reverse index of role id -> (profile field, value), built once
+        self.role_index = self.build_role_index()
+
+        # Decoded member profiles, kept in sync from member events, and the
+        # batch scorer working on their encoded columns
+        self.scorer = BatchScorer(self.category_weights, self.encoder)
+        self.profiles = ProfileStore(self.extract_user_data, self.encoder, self.is_candidate)
+        # Scans with at least this many candidates run in a worker process (None to disable)
+        self.scoring_pool = ScoringPool(threshold=20000)
+        # Ranked candidate tiers per (guild, requester profile, partner gender);
+        # tiers keep enough candidates to serve the biggest count after exclusions
+        self.match_cache = MatchCache()
+        self.match_depth = 5 + self.history.per_user + self.history.recent + 1
+        for guild in self.bot.guilds:
+            self.profiles.load_guild(guild)
         
     find = app_commands.Group(name="find", description="Find a match commands.") 
     @find.command(name="match", description="Find the best match for you! (In the experimental stage)")
@@ -169,8 +192,8 @@ class MatchSySystems(commands.Cog):
             app_commands.Choice(name="♂️ Male", value="male")
         ]
     )
-    @app_commands.describe(partner_gender="What gender your partner should be?")
-    async def find_match(self, interaction: discord.Interaction, partner_gender: app_commands.Choice[str]):
+    @app_commands.describe(partner_gender="What gender your partner should be?", count="How many matches to show (1 to 5)")
+    async def find_match(self, interaction: discord.Interaction, partner_gender: app_commands.Choice[str], count: app_commands.Range[int, 1, 5] = 1):
         try: 
             channel = interaction.channel
             if channel.id not in [1354185377371525271, 1354861828047503461]:
@@ -179,105 +202,49 @@ class MatchSySystems(commands.Cog):
                 return 
             
             await interaction.response.defer()
-            user_data = self.extract_user_data(interaction.user)
+            guild = interaction.guild
+            if not self.profiles.is_loaded(guild.id):
+                self.profiles.load_guild(guild)
+
+            user_data = self.profiles.get(guild.id, interaction.user.id) or self.extract_user_data(interaction.user)
             for value in user_data:
                 if value is None:
                     embed = discord.Embed(name="No completed roles.", description="Our matching system is based on your roles, without complicated roles you cannot find the best match.\n\nGet roles from here: https://discord.com/channels/1349136661971206268/1350840245108871250/1353427439782465687", color=colors.forbidden)
                     await interaction.followup.send(embed=embed, ephemeral=True)
             
-            gender_role_id = {
-                "male": 1350851135501766746,
-                "female": 1350851138139852810,
-            }
-            
-    
-            guild = interaction.guild
             max_score = self.get_max_score()
-            preferred_gender_role = discord.utils.get(guild.roles, id=gender_role_id[partner_gender.value])
     
-            # Loop through all members in the guild and extract their data
-            match_candidates = []
+            # Score every eligible candidate of the wanted gender at once,
+            # excluding already matched users and users in the match history
             user_id = interaction.user.id
-    
-            for member in guild.members:
-                if member.bot or member == interaction.user or preferred_gender_role not in member.roles:
-                    continue 
-                
-                if member.id in self.matched_users:
-                    continue
-                
-                member_data = self.extract_user_data(member)
-                # Compare user data with each member's data and calculate a match score
-                score = self.compare_users(user_data, member_data)
-               
-                # Exclude users who are in the match history
-                if user_id in self.match_history and member.id in self.match_history[user_id]:
-                    continue
-                
-                match_candidates.append((member, score))
-               
-            if not match_candidates:
+            columns = self.profiles.candidates(guild.id, partner_gender.value)
+            excluded_ids = await self.history.excluded(guild.id, user_id)
+            excluded_ids.add(user_id)
+            cache_key = (guild.id, self.encoder.encode(user_data), partner_gender.value)
+            generation = self.profiles.generation(guild.id)
+            tiers = self.match_cache.get(cache_key, generation)
+            if tiers is None:
+                tiers = await self.scoring_pool.run(rank_tiers, self.scorer, user_data, columns, self.match_depth)
+                self.match_cache.set(cache_key, generation, tiers)
+            top_matches = pick_from_tiers(tiers, excluded_ids, count)
+
+            # Keep only the best `count` candidates, ties broken at random
+            best_matches = []
+            for member_id, score in top_matches:
+                member = guild.get_member(member_id)
+                if member is not None:
+                    best_matches.append((member, score))
+            if not best_matches:
                 await interaction.followup.send("No new matches found!")
                 return
-
-            # Sort candidates by score (descending)
-            match_candidates.sort(key=lambda x: x[1], reverse=True)
-            highest_score = match_candidates[0][1]
-            best_matches = [candidate for candidate, score in match_candidates if score == highest_score]
-            best_match = random.choice(best_matches)
-            
-            # Update match history
-            if user_id not in self.match_history:
-                self.match_history[user_id] = []
-            self.match_history[user_id].append(best_match.id)
-    
-            # Limit match history to the last 5 matches
-            if len(self.match_history[user_id]) > 5:
-                self.match_history[user_id].pop(0)
             
-            self.matched_users.append(best_match.id)
-            if len(self.matched_users) > 10:
-                self.matched_users.pop(0)
+            for rank, (best_match, highest_score) in enumerate(best_matches, start=1):
+                # Update match history
+                self.history.record(guild.id, user_id, best_match.id)
 
-            if best_match:
-                is_verified = True if any(r.id in self.verified_roles_id for r in best_match.roles) else False
-                score_percentage = round((highest_score / max_score) * 100, 2)
-                member = self.extract_user_data(best_match)
-                str_height = str(member['height']) if member['height'] else '' 
-                results = [
-                    "### <a:PinkHearts:1359829058942144594> Results\n",
-                    f"> <a:Heartribbon:1359828243947061339> **Your best match:** {best_match.mention}\n",
-                    f"> <a:HeartPopUp:1359829671503466536> **Matching Score:** {highest_score}\n",
-                    f"> <a:blowingHearts:1359829944774955058> **Percentage:** {score_percentage}%\n",
-                    f"### <a:HeartMessage:1359827376644821113> {best_match.display_name}'s Information\n",
-                    f"> **Discord name:** {best_match.display_name}\n",
-                    f"> **Gender:** {member['gender']}.\n" if member.get("gender") else f"Must be {partner_gender.value}\n",
-                    f"> **Age:** {member['age']} years old.\n" if member.get("age") else "> **Age:** Ask them.\n",
-                    f"> **Height:** {str_height[0]}'{str_height[1]}\n" if str_height else "> **Height:** Ask them.\n",
-                    f"> **Region:** {member['region']}\n" if member.get("region") else "> **Region:** Ask them.\n",
-                    f"> **Personality:** {', '.join(member['personality'])}\n" if member.get("personality") else "> **Personality:** Ask them.\n",
-                    f"> **Relationship Status:** {member['relationship_status']}\n" if member.get("relationship_status") else "> **Relationship Status:** Ask them.\n",
-                    f"> **DMs Status:** {member['dms_status']}\n" if member.get("dms_status") else "> **DMs Status:** Ask them.\n",
-                    f"> **Height Preference:** {member['height_preference']}\n" if member.get("height_preference") else "> **Height Preference:** Ask them.\n",
-                    f"> **Age Preference:** {member['age_preference']}\n" if member.get("age_preference") else "> **Age Preference:** Ask them.\n",
-                    f"> **Distance Preference:** {member['distance_preference']}\n" if member.get("distance_preference") else "> **Distance Preference:** Ask them.\n",
-                    f"> **Personality Preference:** {', '.join(member['personality_preference'])}\n" if member.get("personality_preference") else "> **Personality Preference:** Ask them.\n",
-                    f"> **Hobbies:** {', '.join(member['hobbies'])}\n" if member.get("hobbies") else "> **Hobbies:** Ask them.\n",
-                    "<:warn:1359816466513526885> Warning!\n> You have to ask them for dms before doing so.\n" if member.get("dms_status") == "dms ask" else "\n",
-                    "<:warn:1359816466513526885> Warning!\n> This member is not verified, and there's a high risk they may be a catfisher or underage. ⚠️\n> We recommend requesting proof to verify their identity if you're going to hit them up." if not is_verified else "✅ This member is verified!"
-                ]
-                embed = discord.Embed(
-                    title="<a:Heartspin:1359829315633680497> Found a Match!",
-                    description="".join(results),
-                    color=colors.primary
-                )
+                embed = self.build_match_embed(guild, best_match, highest_score, max_score, partner_gender.value, rank)
                 view = ControlPanel(best_match)
-                embed.add_field(name="Note", value="- The matching system doesn't work randomly. It matches you with the best candidate based on your preferences and roles.\n\n- ❗This command is still in the experimental stage. share your feedback in <#1354071052246061057> channel.")
-                embed.set_thumbnail(url=best_match.display_avatar.url)
-                embed.set_image(url=random.choice(self.love_gifs))
                 await interaction.followup.send(embed=embed, view=view)
-            else:
-                interaction.followup.send("No match found!")
         except Exception:
             await error_send(interaction)
     
@@ -287,12 +254,99 @@ class MatchSySystems(commands.Cog):
             embed = discord.Embed(title="Wait please!! >_<", description=f"Slow down! Try again in {error.retry_after:.2f} seconds.", color=colors.error)
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
+    async def cog_unload(self):
+        self.scoring_pool.shutdown()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild in self.bot.guilds:
+            self.profiles.load_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.profiles.update(after)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.profiles.remove(member)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.profiles.unload_guild(guild.id)
+
+    def build_match_embed(self, guild, best_match, highest_score, max_score, partner_gender, rank=1):
+        """
+        Build the result embed shown for a single match.
+        """
+        is_verified = True if any(r.id in self.verified_roles_id for r in best_match.roles) else False
+        score_percentage = round((highest_score / max_score) * 100, 2)
+        member = self.profiles.get(guild.id, best_match.id) or self.extract_user_data(best_match)
+        str_height = str(member['height']) if member['height'] else '' 
+        results = [
+            "### <a:PinkHearts:1359829058942144594> Results\n",
+            f"> <a:Heartribbon:1359828243947061339> **Your best match:** {best_match.mention}\n" if rank == 1 else f"> <a:Heartribbon:1359828243947061339> **Your match #{rank}:** {best_match.mention}\n",
+            f"> <a:HeartPopUp:1359829671503466536> **Matching Score:** {highest_score}\n",
+            f"> <a:blowingHearts:1359829944774955058> **Percentage:** {score_percentage}%\n",
+            f"### <a:HeartMessage:1359827376644821113> {best_match.display_name}'s Information\n",
+            f"> **Discord name:** {best_match.display_name}\n",
+            f"> **Gender:** {member['gender']}.\n" if member.get("gender") else f"Must be {partner_gender}\n",
+            f"> **Age:** {member['age']} years old.\n" if member.get("age") else "> **Age:** Ask them.\n",
+            f"> **Height:** {str_height[0]}'{str_height[1]}\n" if str_height else "> **Height:** Ask them.\n",
+            f"> **Region:** {member['region']}\n" if member.get("region") else "> **Region:** Ask them.\n",
+            f"> **Personality:** {', '.join(self.encoder.names('personality', member['personality']))}\n" if member.get("personality") else "> **Personality:** Ask them.\n",
+            f"> **Relationship Status:** {member['relationship_status']}\n" if member.get("relationship_status") else "> **Relationship Status:** Ask them.\n",
+            f"> **DMs Status:** {member['dms_status']}\n" if member.get("dms_status") else "> **DMs Status:** Ask them.\n",
+            f"> **Height Preference:** {member['height_preference']}\n" if member.get("height_preference") else "> **Height Preference:** Ask them.\n",
+            f"> **Age Preference:** {member['age_preference']}\n" if member.get("age_preference") else "> **Age Preference:** Ask them.\n",
+            f"> **Distance Preference:** {member['distance_preference']}\n" if member.get("distance_preference") else "> **Distance Preference:** Ask them.\n",
+            f"> **Personality Preference:** {', '.join(self.encoder.names('personality_preference', member['personality_preference']))}\n" if member.get("personality_preference") else "> **Personality Preference:** Ask them.\n",
+            f"> **Hobbies:** {', '.join(self.encoder.names('hobbies', member['hobbies']))}\n" if member.get("hobbies") else "> **Hobbies:** Ask them.\n",
+            "<:warn:1359816466513526885> Warning!\n> You have to ask them for dms before doing so.\n" if member.get("dms_status") == "dms ask" else "\n",
+            "<:warn:1359816466513526885> Warning!\n> This member is not verified, and there's a high risk they may be a catfisher or underage. ⚠️\n> We recommend requesting proof to verify their identity if you're going to hit them up." if not is_verified else "✅ This member is verified!"
+        ]
+        embed = discord.Embed(
+            title="<a:Heartspin:1359829315633680497> Found a Match!",
+            description="".join(results),
+            color=colors.primary
+        )
+        embed.add_field(name="Note", value="- The matching system doesn't work randomly. It matches you with the best candidate based on your preferences and roles.\n\n- ❗This command is still in the experimental stage. share your feedback in <#1354071052246061057> channel.")
+        embed.set_thumbnail(url=best_match.display_avatar.url)
+        embed.set_image(url=random.choice(self.love_gifs))
+        return embed
+
     def get_max_score(self):
         max_score = 0
         for value in self.category_weights.values():
             max_score += value["score"]
         return max_score
     
+    def build_role_index(self):
+        """
+        Build a reverse lookup of role id -> (profile field, value) so decoding
+        a member's profile is a single dict hit per role. Values of multi-choice
+        fields are the bit of the role in the field's bitmask.
+        """
+        category_fields = {
+            "Gender": 'gender',
+            "Height Preference": 'height_preference',
+            "Age Preference": 'age_preference',
+            "Distance Preference": 'distance_preference',
+            "Personality Preference": 'personality_preference',
+            "Hobbies and Interests": 'hobbies',
+            "Relationship Status": 'relationship_status',
+            "Dms Status": 'dms_status',
+        }
+        role_index = {}
+        tables = [(field, self.category_weights[category]["roles"]) for category, field in category_fields.items()]
+        tables += [('age', self.age_roles), ('height', self.height_roles), ('region', self.region), ('personality', self.personality)]
+        for field, roles in tables:
+            for key, role_id in roles.items():
+                if field in self.multi_value_fields:
+                    key = self.encoder.mask(field, [key])
+                role_index[role_id] = (field, key)
+        return role_index
+
     def extract_user_data(self, user):
         """
         Extract the data for a single user (age, height, preferences, etc.)
@@ -303,59 +357,43 @@ class MatchSySystems(commands.Cog):
             'age': None,
             'height': None,
             'region': None,
-            'personality': [],
+            'personality': 0,
             'relationship_status': None,
             'dms_status': None,
             'height_preference': None,
             'age_preference': None,
             'distance_preference': None,
-            'personality_preference': [],
-            'hobbies': [],
+            'personality_preference': 0,
+            'hobbies': 0,
         }
 
         for role in user.roles:
-            # Fill user_data with the information (similar to what you did before)
-            if role.id in self.age_roles.values():
-                user_data['age'] = next((key for key, value in self.age_roles.items() if value == role.id), None)
-            
-            if role.id in self.height_roles.values():
-                user_data['height'] = next((key for key, value in self.height_roles.items() if value == role.id), None)
-            
-            if role.id in self.region.values():
-                user_data['region'] = next((key for key, value in self.region.items() if value == role.id), None)
-            
-            if role.id in self.personality.values():
-                user_data['personality'].append(next((key for key, value in self.personality.items() if value == role.id), ""))
-            
-            if role.id in self.category_weights["Relationship Status"]["roles"].values():
-                user_data['relationship_status'] = next((key for key, value in self.category_weights["Relationship Status"]["roles"].items() if value == role.id), None)
-            
-            if role.id in self.category_weights["Dms Status"]["roles"].values():
-                user_data['dms_status'] = next((key for key, value in self.category_weights["Dms Status"]["roles"].items() if value == role.id), None)
+            entry = self.role_index.get(role.id)
+            if entry is None:
+                continue
+            field, key = entry
+            if field in self.multi_value_fields:
+                user_data[field] |= key
+            else:
+                user_data[field] = key
 
-            # Preferences data
-            if role.id in self.category_weights["Height Preference"]["roles"].values():
-                user_data['height_preference'] = next((key for key, value in self.category_weights["Height Preference"]["roles"].items() if value == role.id), None)
+            if field == 'height_preference':
                 if user_data["age"] and user_data['height_preference']:
                     if user_data["height_preference"] == "younger" and user_data["age"] == 18:
                         user_data['height_preference'] = "same age"
-
-            if role.id in self.category_weights["Age Preference"]["roles"].values():
-                user_data['age_preference'] = next((key for key, value in self.category_weights["Age Preference"]["roles"].items() if value == role.id), None)
-
-            if role.id in self.category_weights["Distance Preference"]["roles"].values():
-                user_data['distance_preference'] = next((key for key, value in self.category_weights["Distance Preference"]["roles"].items() if value == role.id), None)
-
-            if role.id in self.category_weights["Personality Preference"]["roles"].values():
-                user_data['personality_preference'].append(next((key for key, value in self.category_weights["Personality Preference"]["roles"].items() if value == role.id), None))
-                
-            if role.id in self.category_weights["Hobbies and Interests"]["roles"].values():
-                user_data['hobbies'].append(next((key for key, value in self.category_weights["Hobbies and Interests"]["roles"].items() if value == role.id), None))
-            
-            if role.id in self.category_weights["Gender"]["roles"].values():
-                user_data['gender'] = next((key for key, value in self.category_weights["Gender"]["roles"].items() if value == role.id), None)
         return user_data
 
+    def is_candidate(self, member_data):
+        """
+        Hard filters: members with closed dms, taken or not looking can never
+        score above zero, so they are kept out of the candidate sets.
+        """
+        if member_data['dms_status'] == "dms closed":
+            return False
+        if member_data['relationship_status'] in ("taken", "not looking"):
+            return False
+        return True
+
     def compare_users(self, user_data, member_data):
         """
         Compare two users based on their preferences and return a match score.
@@ -415,29 +453,13 @@ class MatchSySystems(commands.Cog):
             elif user_data['distance_preference'] == "Long distance" and member_data['distance_preference'] == "Long distance":
                 score += self.category_weights["Distance Preference"]["score"]
     
-        # Personality preference comparison
-        if member_data['personality'] is not None and user_data['personality_preference'] is not None:
-            cap = 3
-            i = 0
-            for p1 in user_data['personality_preference']:
-                if i >= cap:
-                    break
-                for p2 in member_data['personality']:
-                    if p1 == p2:
-                        score += self.category_weights["Personality Preference"]["score"]
-                        i += 1
+        # Personality preference and hobbies overlap (bitmasks), capped at 3 matches
+        cap = 3
+        shared_personality = (user_data['personality_preference'] & member_data['personality']).bit_count()
+        score += min(shared_personality, cap) * self.category_weights["Personality Preference"]["score"]
         
-        # Hobbies and interests comparison
-        if member_data['hobbies'] is not None and user_data['hobbies'] is not None:
-            cap = 3
-            i = 0
-            for h1 in user_data['hobbies']:
-                if i >= cap:
-                    break
-                for h2 in member_data['hobbies']:
-                    if h1 == h2:
-                        score += self.category_weights["Hobbies and Interests"]["score"]
-                        i += 1
+        shared_hobbies = (user_data['hobbies'] & member_data['hobbies']).bit_count()
+        score += min(shared_hobbies, cap) * self.category_weights["Hobbies and Interests"]["score"]
     
         return score
 
@@ -3,14 +3,24 @@ from discord import app_commands
 from discord.ext import commands 
 from utilities import Permissions, colors, get_all_variables, get_emojis_variables, get_message_from_template
 from utilities import send_log, send_notif, get_link, format_time
+from utilities.database import Database
 import asyncio
 from errors.error_logger import error_send
-from typing import List
-import sqlite3 
+from typing import Dict, List, Optional
 import datetime
 import time
 
 
+class GuildConfig:
+    """Moderation settings of a guild, as stored in the configs table"""
+    __slots__ = ("guild_id", "jail_role_id", "sus_role_id")
+
+    def __init__(self, guild_id: int, jail_role_id: Optional[int] = None, sus_role_id: Optional[int] = None):
+        self.guild_id = guild_id
+        self.jail_role_id = jail_role_id
+        self.sus_role_id = sus_role_id
+
+
 class ServerLinkView(discord.ui.View):
     def __init__(self, guild_name, channel_link):
         super().__init__(timeout=None)
@@ -82,35 +92,40 @@ class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.delete_delay = 5
-        self.conn = sqlite3.connect("database/data.db")
-        self.create_table()
+        self.db = Database()
+        # Guild ID -> GuildConfig, loaded on first use and updated on every change
+        self.configs: Dict[int, GuildConfig] = {}
+        # Guild ID -> number of config changes, so a load that raced a change is not cached
+        self.config_versions: Dict[int, int] = {}
+        self.bot.loop.create_task(self.create_table())
         self.reports_channel_id = 1361091376162410547
         
-    def create_table(self):
-        cur = self.conn.cursor()
-        try:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS configs (
-                guild_id INTEGER PRIMARY KEY,
-                jail_role_id INTEGER,
-                sus_role_id INTEGER
-            )""")
-            self.conn.commit()
-        finally:
-            cur.close()
+    async def create_table(self):
+        await self.db.ensure_schema()
     
-    def upsert_config(self, guild_id: int, column: str, value: int):
-        cur = self.conn.cursor()
-        try:
-            cur.execute("SELECT 1 FROM configs WHERE guild_id = ?", (guild_id,))
-            exists = cur.fetchone()
-            if exists:
-                cur.execute(f"UPDATE configs SET {column} = ? WHERE guild_id = ?", (value, guild_id))
+    async def upsert_config(self, guild_id: int, column: str, value: int):
+        await self.db.upsert("configs", {"guild_id": guild_id, column: value}, ["guild_id"])
+        self.config_versions[guild_id] = self.config_versions.get(guild_id, 0) + 1
+        config = self.configs.get(guild_id)
+        if config is not None:
+            setattr(config, column, value)
+    
+    async def get_config(self, guild_id: int) -> GuildConfig:
+        config = self.configs.get(guild_id)
+        if config is None:
+            version = self.config_versions.get(guild_id, 0)
+            row = await self.db.fetchone("SELECT jail_role_id, sus_role_id FROM configs WHERE guild_id = ?", (guild_id,))
+            config = GuildConfig(guild_id, **row) if row else GuildConfig(guild_id)
+            if self.config_versions.get(guild_id, 0) == version:
+                self.configs[guild_id] = config
             else:
-                cur.execute(f"INSERT INTO configs (guild_id, {column}) VALUES (?, ?)", (guild_id, value))
-            self.conn.commit()
-        finally:
-            cur.close()
+                # Changed while loading: the row read may predate the change
+                return await self.get_config(guild_id)
+        return config
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.configs.pop(guild.id, None)
     
     async def check_perm(self, interaction, user_perms: List, bot_perms: List, target: discord.Member = None):
         permissions = Permissions(interaction)
@@ -132,7 +147,7 @@ class Moderation(commands.Cog):
                 response_embed = discord.Embed(description="That role is higher than my top role. The role should be under mine so i can assign it to offenders.", color=colors.forbidden)
                 await interaction.response.send_message(embed=response_embed, ephemeral=True)
                 return 
-            self.upsert_config(interaction.guild.id, "jail_role_id", role.id)
+            await self.upsert_config(interaction.guild.id, "jail_role_id", role.id)
             response_embed = discord.Embed(title="Set up finished!", description=f"{role.name} have been set successfully!", color=colors.primary)
             await interaction.response.send_message(embed=response_embed)
         except Exception:
@@ -152,7 +167,7 @@ class Moderation(commands.Cog):
             role: discord.Role
             try: 
                 role = await guild.create_role(name="Jailed", color=0xec1a1a)
-                self.upsert_config(guild.id, "jail_role_id", role.id)
+                await self.upsert_config(guild.id, "jail_role_id", role.id)
             except discord.Forbidden:
                 response_embed.description = "I don't have permission to create roles. make sure to give me manage roles permission."
                 await original_response.edit(embed=response_embed)
@@ -203,14 +218,7 @@ class Moderation(commands.Cog):
             guild = interaction.guild
             role_id = None
             # get role from database 
-            cur = self.conn.cursor()
-            try:
-                cur.execute("SELECT jail_role_id FROM configs WHERE guild_id = ?", (guild.id,))
-                result = cur.fetchone()
-                role_id = result[0] if result else None
-                self.conn.commit()
-            finally:
-                cur.close()
+            role_id = (await self.get_config(guild.id)).jail_role_id
             # in case there's no role in database for that server 
             if not role_id or not discord.utils.get(guild.roles, id=role_id):
                 not_found_embed = discord.Embed(title="Not found", description="There's no jail role found.\n`/jail role`: To add a jail role if you already have one in the server.\n`/jail create`: If you don't have a jail role do this command to setup one automatically.", color=colors.forbidden)
@@ -253,17 +261,9 @@ class Moderation(commands.Cog):
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
             # Jailing process 
-            role_id: int
             guild = interaction.guild
             # Get role from database 
-            cur = self.conn.cursor()
-            try:
-                cur.execute("SELECT jail_role_id FROM configs WHERE guild_id = ?", (guild.id,))
-                result = cur.fetchone()
-                role_id = result[0] if result else None
-                self.conn.commit()
-            finally:
-                cur.close()
+            role_id = (await self.get_config(guild.id)).jail_role_id
             # fetch role 
             not_found_embed = discord.Embed(title="Not found", description="There's no jail role found.\n`/jail role`: To add a jail role if you already have one in the server.\n`/jail create`: If you don't have a jail role do this command to setup one automatically.", color=colors.forbidden)
             if not role_id:
@@ -305,21 +305,16 @@ class Moderation(commands.Cog):
             guild = interaction.guild
             role = None
             response_embed = discord.Embed(title="Setting Up", description="Creating and setting up sus role is in progress..", color=colors.primary)
-            cur = self.conn.cursor()
             try: 
-                cur.execute("SELECT sus_role_id FROM configs WHERE guild_id = ?", (guild.id,))
-                result = cur.fetchone()
-                self.conn.commit()
-                role = discord.utils.get(result[0]) if result else None
+                role_id = (await self.get_config(guild.id)).sus_role_id
+                role = guild.get_role(role_id) if role_id else None
                 if not role:
                     role = await guild.create_role(name="Sus", color=0xfa0606)
-                    self.upsert_config(guild.id, "sus_role_id", role.id)
+                    await self.upsert_config(guild.id, "sus_role_id", role.id)
             except discord.Forbidden:
                 response_embed.description = "I don't have permission to create roles. make sure to give me manage roles permission."
                 await interaction.followup.send(embed=response_embed)
                 return 
-            finally:
-                cur.close()
             # Get bot top role position 
             highest_role = max((role for role in guild.roles if role < guild.me.top_role), key=lambda r: r.position)
             # move role right below the bot highest role 
@@ -356,7 +351,7 @@ That's it! Now, suspicious users won't be able to see or interact in those chann
                 await interaction.response.send_message(embed=response_embed, ephemeral=True)
                 return 
             # Save role in database 
-            self.upsert_config(guild.id, "sus_role_id", role.id)
+            await self.upsert_config(guild.id, "sus_role_id", role.id)
             # respond to user
             embed = discord.Embed(title="Role Have been set", description=f"{role.mention} was set as a sus role!", color = colors.primary)
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -376,15 +371,7 @@ That's it! Now, suspicious users won't be able to see or interact in those chann
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
             guild = interaction.guild
-            role_id = None
-            cur = self.conn.cursor()
-            try:
-                cur.execute("SELECT sus_role_id FROM configs WHERE guild_id = ?", (guild.id,))
-                result = cur.fetchone()
-                role_id = result[0] if result else None
-                self.conn.commit()
-            finally:
-                cur.close()
+            role_id = (await self.get_config(guild.id)).sus_role_id
             if not role_id and not discord.utils.get(guild.roles, id = role_id):
                 response_embed = discord.Embed(title="Not Found", description="No Sus role found, do `/sus setup` to setup one, or `/sus role` to set a sus role if you already have one.", color=colors.forbidden)
                 await interaction.response.send_message(embed=response_embed, ephemeral=True)
@@ -421,16 +408,7 @@ That's it! Now, suspicious users won't be able to see or interact in those chann
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
             guild = interaction.guild
-            role_id = None
-            cur = self.conn.cursor()
-            try:
-                cur.execute("SELECT sus_role_id FROM configs WHERE guild_id = ?", (guild.id,))
-                result = cur.fetchone()
-                role_id = result[0] if result else None
-                self.conn.commit()
-            finally:
-                cur.close()
-                
+            role_id = (await self.get_config(guild.id)).sus_role_id
             if not role_id and not discord.utils.get(guild.roles, id = role_id):
                 response_embed = discord.Embed(title="Not Found", description="No Sus role found, do `/sus setup` to setup one, or `/sus role` to set a sus role if you already have one.", color=colors.forbidden)
                 await interaction.response.send_message(embed=response_embed, ephemeral=True)
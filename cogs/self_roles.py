@@ -6,6 +6,7 @@ from errors.error_logger import error_send
 from utilities.variables import get_emojis_variables
 import time
 from utilities import colors
+from utilities.message_router import MessageRouter, message_handler
 from datetime import timedelta
 
 
@@ -28,6 +29,12 @@ class SelfRoles(commands.Cog):
         self.last_remind = {}
         self.warns = {}
     
+    async def cog_load(self):
+        MessageRouter().add_cog(self)
+    
+    async def cog_unload(self):
+        MessageRouter().remove_cog(self)
+    
     self_group = app_commands.Group(name="self", description="Self related commands")
     roles_group = app_commands.Group(name="roles", description="roles related commands", parent=self_group)
     
@@ -52,12 +59,11 @@ class SelfRoles(commands.Cog):
             
             
     # roles reminder 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    @message_handler()
+    async def roles_reminder(self, ctx):
         try:
-            if message.author.bot:
-                return 
-            user = message.author
+            message = ctx.message
+            user = ctx.author
             # add delay 
             current_time = time.time()
             if user.id not in self.last_remind:
@@ -87,16 +93,9 @@ class SelfRoles(commands.Cog):
             
             emojis = get_emojis_variables()
             
-            has_age_role = False
-            has_gender_role = False
             # check roles
-            for role in user.roles:
-                # check age role
-                if role.id in age_roles_ids.values():
-                    has_age_role = True
-                # check gender role 
-                if role.id in gender_roles_ids.values():
-                    has_gender_role = True 
+            has_age_role = not ctx.role_ids.isdisjoint(age_roles_ids.values())
+            has_gender_role = not ctx.role_ids.isdisjoint(gender_roles_ids.values())
              
             if has_gender_role == False or has_gender_role == False:
                 if user.id not in self.warns:
@@ -1,9 +1,12 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import time
+import asyncio
+from typing import Any, Dict, Set
 from utilities import colors
 from utilities.database import Database
+from utilities.message_router import MessageRouter, message_handler
+from errors.error_logger import error_send
 
 
 
@@ -11,87 +14,139 @@ class StickMessage(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = Database()
-        self.stick_msgs = {}
-        self.last_message_time = {}
+        # Channel ID -> {"guild_id", "content", "message_id"} of every stick message
+        self.sticks: Dict[int, Dict[str, Any]] = {}
+        # Guild ID -> IDs of its channels with a stick message
+        self.guild_sticks: Dict[int, Set[int]] = {}
+        # Reposts wait until a channel has been quiet for `quiet_window` seconds,
+        # but never longer than `max_delay` seconds after the first new message
+        self.quiet_window = 3
+        self.max_delay = 15
+        self.last_activity: Dict[int, float] = {}
+        self.pending: Dict[int, asyncio.Task] = {}
+        # Channels whose stick message is being replaced right now
+        self.reposting: Set[int] = set()
 
         # Initialize database table
-        self.bot.loop.create_task(self._initialize_database())
+        self._loading = self.bot.loop.create_task(self._initialize_database())
 
     # Database initialization
     async def _initialize_database(self):
-        await self.db.create_table("stick_messages", """
-            guild_id INTEGER PRIMARY KEY,
-            stick_messages TEXT
-        """)
-
-    # Save stick messages to the database
-    async def _save_to_db(self, guild_id):
-        await self.db.json_set(
-            "stick_messages", 
-            "guild_id", 
-            guild_id, 
-            "stick_messages", 
-            self.stick_msgs
+        await self.db.ensure_schema()
+        rows = await self.db.fetchall("SELECT guild_id, channel_id, content, last_message_id FROM stick_channels")
+        for row in rows:
+            self._add(row["guild_id"], row["channel_id"], row["content"], row["last_message_id"])
+
+    def _add(self, guild_id, channel_id, content, message_id=None):
+        stick = {"guild_id": guild_id, "content": content, "message_id": message_id}
+        self.sticks[channel_id] = stick
+        self.guild_sticks.setdefault(guild_id, set()).add(channel_id)
+        return stick
+
+    def _remove(self, channel_id):
+        stick = self.sticks.pop(channel_id, None)
+        if stick:
+            channels = self.guild_sticks.get(stick["guild_id"], set())
+            channels.discard(channel_id)
+            if not channels:
+                self.guild_sticks.pop(stick["guild_id"], None)
+        return stick
+
+    # Save a channel's stick message to the database
+    async def _save_to_db(self, channel_id, stick):
+        await self.db.upsert(
+            "stick_channels",
+            {
+                "guild_id": stick["guild_id"],
+                "channel_id": channel_id,
+                "content": stick["content"],
+                "last_message_id": stick["message_id"]
+            },
+            ["channel_id"]
         )
 
-    # Load stick messages from the database
-    async def _load_from_db(self, guild_id):
-        data = await self.db.json_get(
-            "stick_messages", 
-            "guild_id", 
-            guild_id, 
-            "stick_messages"
-        )
-        self.stick_msgs = data or {}
-
-    # Check if a channel is on cooldown
-    def _is_on_cooldown(self, channel_id):
-        current_time = time.time()
-        last_time = self.last_message_time.get(channel_id, 0)
-        cooldown_duration = 3
-        return (current_time - last_time) < cooldown_duration
-
-    # Fetch the last bot message in the channel with the stick message content
-    async def _get_last_bot_message(self, channel, stick_message):
-        async for message in channel.history(limit=15):
-            if message.author.id == self.bot.user.id and message.embeds and stick_message in message.embeds[0].description:
-                return message
-        return None
+    # Delete the stick message last posted in a channel, if it's still there
+    async def _delete_posted(self, channel, stick):
+        if not stick["message_id"]:
+            return
+        try:
+            await channel.get_partial_message(stick["message_id"]).delete()
+        except discord.NotFound:
+            pass
+        stick["message_id"] = None
+
+    # Replace the posted stick message with a new one at the bottom of the channel
+    async def _repost(self, channel, stick):
+        await self._delete_posted(channel, stick)
+        embed = discord.Embed(description=stick["content"], color=colors.primary)
+        message = await channel.send(embed=embed)
+        stick["message_id"] = message.id
+        await self._save_to_db(channel.id, stick)
+
+    # Wait for the channel to calm down, then repost; again if messages came in meanwhile
+    async def _repost_later(self, channel):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        try:
+            while True:
+                activity = self.last_activity[channel.id]
+                wait = min(activity + self.quiet_window, deadline) - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                stick = self.sticks.get(channel.id)
+                if not stick:
+                    break
+                self.reposting.add(channel.id)
+                try:
+                    await self._repost(channel, stick)
+                finally:
+                    self.reposting.discard(channel.id)
+                if channel.id not in self.sticks or self.last_activity.get(channel.id, activity) == activity:
+                    break
+                deadline = loop.time() + self.max_delay
+        except Exception:
+            await error_send()
+        finally:
+            if self.pending.get(channel.id) is asyncio.current_task():
+                del self.pending[channel.id]
+                self.last_activity.pop(channel.id, None)
+
+    async def cog_load(self):
+        MessageRouter().add_cog(self)
+
+    async def cog_unload(self):
+        MessageRouter().remove_cog(self)
+        for task in self.pending.values():
+            task.cancel()
 
-    # Process stick messages when a new message is sent
     @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.guild is None:
-            return 
-        
-        guild_id = message.guild.id
-        channel_id = message.channel.id
-        await self._load_from_db(guild_id)
-
-        # Ignore channels without a stick message or if the channel is on cooldown
-        if str(channel_id) not in self.stick_msgs or self._is_on_cooldown(channel_id):
-            return
+    async def on_guild_remove(self, guild):
+        # Stop pending reposts; the stick messages stay stored for a rejoin
+        for channel_id in self.guild_sticks.get(guild.id, ()):
+            task = self.pending.pop(channel_id, None)
+            if task:
+                task.cancel()
+            self.last_activity.pop(channel_id, None)
 
-        stick_message = self.stick_msgs[str(channel_id)]
-        if not stick_message:
-            return
-        
-        if message.author.id == self.bot.user.id:
-            if message.embeds and len(message.embeds) > 0:
-                embed = message.embeds[0]
-                if embed.description and embed.description == stick_message:
-                    return
-           
-        
-        # Delete the previous stick message
-        last_stick_message = await self._get_last_bot_message(message.channel, stick_message)
-        if last_stick_message:
-            await last_stick_message.delete()
-
-        # Send the new stick message
-        embed = discord.Embed(description=stick_message, color=colors.primary)
-        await message.channel.send(embed=embed)
-        self.last_message_time[channel_id] = time.time()
+    def has_stick(self, ctx):
+        return ctx.channel_id in self.sticks
+
+    # Process stick messages when a new message is sent
+    @message_handler(bots=True, when="has_stick")
+    async def on_guild_message(self, ctx):
+        stick = self.sticks[ctx.channel_id]
+        # Our own stick message
+        if ctx.author_id == self.bot.user.id:
+            if ctx.message.id == stick["message_id"]:
+                return
+            embeds = ctx.message.embeds
+            if embeds and embeds[0].description == stick["content"]:
+                return
+
+        self.last_activity[ctx.channel_id] = asyncio.get_running_loop().time()
+        if ctx.channel_id not in self.pending:
+            self.pending[ctx.channel_id] = asyncio.create_task(self._repost_later(ctx.channel))
 
     # Slash command to set a stick message
     stick_group = app_commands.Group(name="stick", description="Stick message-related commands")
@@ -104,16 +159,13 @@ class StickMessage(commands.Cog):
             await interaction.followup.send("You don't have permission to use this command!", ephemeral=True)
             return
 
-        guild_id = channel.guild.id
-        await self._load_from_db(guild_id)
-
-        # Set the stick message
-        self.stick_msgs[str(channel.id)] = message
-        await self._save_to_db(guild_id)
-
-        # Send the stick message to the channel
-        embed = discord.Embed(description=message, color=colors.primary)
-        await channel.send(embed=embed)
+        await self._loading
+        # Set the stick message and send it to the channel
+        stick = self.sticks.get(channel.id)
+        if stick is None:
+            stick = self._add(channel.guild.id, channel.id, message)
+        stick["content"] = message
+        await self._repost(channel, stick)
         await interaction.followup.send(f"A stick message has been set in {channel.mention} successfully!", ephemeral=True)
 
     # Slash command to remove a stick message
@@ -125,23 +177,25 @@ class StickMessage(commands.Cog):
             await interaction.followup.send("You don't have permission to use this command!", ephemeral=True)
             return
 
-        guild_id = channel.guild.id
-        await self._load_from_db(guild_id)
-
-        if str(channel.id) in self.stick_msgs:
-            stick_msg = self.stick_msgs[str(channel.id)]
-
-            # Delete the last bot message containing the stick message
-            last_stick_message = await self._get_last_bot_message(channel, stick_msg)
-            if last_stick_message:
-                await last_stick_message.delete()
-
-            del self.stick_msgs[str(channel.id)]
-            await self._save_to_db(guild_id)
+        await self._loading
+        stick = self._remove(channel.id)
+        if stick:
+            task = self.pending.pop(channel.id, None)
+            if task:
+                if channel.id in self.reposting:
+                    # Let the repost finish so the message it sends gets deleted below;
+                    # it stops afterwards since the stick message is gone
+                    await asyncio.wait([task])
+                else:
+                    task.cancel()
+            self.last_activity.pop(channel.id, None)
+            # Delete the last posted stick message
+            await self._delete_posted(channel, stick)
+            await self.db.delete("stick_channels", "channel_id = ?", (channel.id,))
             await interaction.followup.send(f"Stick message in {channel.mention} has been removed successfully!", ephemeral=True)
         else:
             await interaction.followup.send(f"No stick message found in {channel.mention}.", ephemeral=True)
 
 
 async def setup(bot):
-    await bot.add_cog(StickMessage(bot))
\ No newline at end of file
+    await bot.add_cog(StickMessage(bot))
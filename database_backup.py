@@ -1,54 +1,334 @@
+"""Online backups of the bot databases
+
+Snapshots are taken with SQLite's online backup API, a few pages at a time, so
+the bot keeps writing while a backup runs and the copy is always consistent
+(WAL content included). All disk work happens in a worker thread.
+
+Every `full_every`-th run of a database uploads a gzip compressed full snapshot;
+the runs in between only upload the pages that changed since the previous run.
+A backup is restored with `restore` from its full snapshot followed by every
+delta uploaded after it, in order. File names carry a run sequence number, so
+sorting them gives that order; `latest_chain` picks the files of the newest
+backup. Only the last `keep_full` full snapshots and their deltas are kept.
+
+Where the files go is decided by the target: LocalDirectoryTarget copies them to
+a directory, GoogleDriveTarget uploads them to a Drive folder.
+"""
+import asyncio
+import gzip
+import json
 import os
-import discord
-from discord.ext import tasks, commands
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.service_account import Credentials
-
-# Load Google Drive credentials
-SCOPES = ["https://www.googleapis.com/auth/drive.file"]
-creds = Credentials.from_service_account_file("service_account.json", scopes=SCOPES)
-service = build("drive", "v3", credentials=creds)
-
-# File details
+import re
+import shutil
+import sqlite3
+import struct
+import time
+from typing import Iterable, List, Optional, Tuple
+
+# Databases backed up by the bot and the Drive folder they are uploaded to
 LOCAL_FILES = ["database/data.db", "database/data2.db"]
-FOLDER_ID = "11MFLDzhQvLMGTdPe0uThY2dkcQfXvlE9"  
-
-
-def get_file_id(filename):
-    """Check if the file already exists on Google Drive."""
-    query = f"name='{filename}' and trashed=false"
-    results = service.files().list(q=query, fields="files(id)").execute()
-    files = results.get("files", [])
-    return files[0]["id"] if files else None
-
-def upload_database():
-    """Upload or update the database file in Google Drive."""
-    
-    for LOCAL_FILE in LOCAL_FILES:
-        if not os.path.exists(LOCAL_FILE):
-            print(f"File {LOCAL_FILE} not found locally, skipping upload.")
-            continue
-        
-        file_id = get_file_id(LOCAL_FILE)
-    
-        if file_id:
-            # Replace the old file
-            file_metadata = {"name": LOCAL_FILE}
-            media = MediaFileUpload(LOCAL_FILE, resumable=True)
-            try:
-                service.files().update(fileId=file_id, media_body=media).execute()
-                print(f"Updated: {LOCAL_FILE} on Google Drive")
-            except Exception as e:
-                print(f"Failed to update {LOCAL_FILE}: {e}")
-        else:
-            # Upload as a new file
-            file_metadata = {"name": LOCAL_FILE}
-            if FOLDER_ID:
-                file_metadata["parents"] = [FOLDER_ID]
-            media = MediaFileUpload(LOCAL_FILE, resumable=True)
-            try:
-                service.files().create(body=file_metadata, media_body=media).execute()
-                print(f"Uploaded: {LOCAL_FILE} to Google Drive")
-            except Exception as e:
-                print(f"Failed to upload {LOCAL_FILE}: {e}")
\ No newline at end of file
+FOLDER_ID = "11MFLDzhQvLMGTdPe0uThY2dkcQfXvlE9"
+
+DELTA_MAGIC = b"SFDDELTA1"
+# page_size, page_count of the new snapshot, number of changed pages
+DELTA_HEADER = struct.Struct(">III")
+DELTA_PAGE = struct.Struct(">I")
+# <database>-<sequence>-<UTC time>.full.db.gz or .delta.gz
+BACKUP_NAME = re.compile(r"^(?P<stem>.+)-(?P<sequence>\d{8})-\d{8}-\d{6}\.(?P<kind>full\.db|delta)\.gz$")
+
+
+class BackupTarget:
+    """Destination of the backup files (every method is called from a worker thread)"""
+
+    def put(self, path: str) -> None:
+        """Store the file at `path` under its base name"""
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> List[str]:
+        """Get the names of the stored files starting with `prefix`"""
+        raise NotImplementedError
+
+    def delete(self, name: str) -> None:
+        """Delete a stored file"""
+        raise NotImplementedError
+
+
+class LocalDirectoryTarget(BackupTarget):
+    """Copies backup files into a local directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def put(self, path: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        shutil.copy2(path, os.path.join(self.directory, os.path.basename(path)))
+
+    def list(self, prefix: str) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.startswith(prefix)]
+
+    def delete(self, name: str) -> None:
+        os.remove(os.path.join(self.directory, name))
+
+
+class GoogleDriveTarget(BackupTarget):
+    """Uploads backup files to a Google Drive folder
+
+    The Google client libraries and the service account are only loaded on the
+    first upload, so the bot starts without them when another target is used.
+    """
+
+    SCOPES = ["https://www.googleapis.com/auth/drive.file"]
+
+    def __init__(self, folder_id: Optional[str] = FOLDER_ID, credentials_file: str = "service_account.json"):
+        self.folder_id = folder_id
+        self.credentials_file = credentials_file
+        self._service = None
+
+    def _get_service(self):
+        if self._service is None:
+            from googleapiclient.discovery import build
+            from google.oauth2.service_account import Credentials
+            creds = Credentials.from_service_account_file(self.credentials_file, scopes=self.SCOPES)
+            self._service = build("drive", "v3", credentials=creds)
+        return self._service
+
+    def put(self, path: str) -> None:
+        from googleapiclient.http import MediaFileUpload
+        file_metadata = {"name": os.path.basename(path)}
+        if self.folder_id:
+            file_metadata["parents"] = [self.folder_id]
+        media = MediaFileUpload(path, resumable=True)
+        self._get_service().files().create(body=file_metadata, media_body=media).execute()
+
+    def _find(self, prefix: str) -> List[dict]:
+        query = f"name contains '{prefix}' and trashed = false"
+        if self.folder_id:
+            query += f" and '{self.folder_id}' in parents"
+        files, page_token = [], None
+        while True:
+            response = self._get_service().files().list(
+                q=query, fields="nextPageToken, files(id, name)", pageToken=page_token
+            ).execute()
+            files.extend(f for f in response.get("files", []) if f["name"].startswith(prefix))
+            page_token = response.get("nextPageToken")
+            if page_token is None:
+                return files
+
+    def list(self, prefix: str) -> List[str]:
+        return [f["name"] for f in self._find(prefix)]
+
+    def delete(self, name: str) -> None:
+        for f in self._find(name):
+            if f["name"] == name:
+                self._get_service().files().delete(fileId=f["id"]).execute()
+
+
+class BackupManager:
+    """Takes full and incremental snapshots of SQLite databases"""
+
+    def __init__(
+        self,
+        sources: Iterable[str],
+        target: BackupTarget,
+        staging_dir: str = "database/backups",
+        full_every: int = 24,
+        keep_full: int = 7,
+        pages_per_step: int = 256,
+        step_sleep: float = 0.005
+    ):
+        """Create a backup manager
+
+        Args:
+            sources: Paths of the databases to back up
+            target: Where the backup files are stored
+            staging_dir: Directory holding the last snapshot of every database,
+                the base of the next delta
+            full_every: Number of runs per full snapshot; the others are deltas
+            keep_full: Number of full snapshots kept in the target, with the
+                deltas taken after them; older files are deleted
+            pages_per_step: Pages copied per step of the online backup
+            step_sleep: Seconds the backup pauses between steps, letting writers in
+        """
+        self.sources = list(sources)
+        self.target = target
+        self.staging_dir = staging_dir
+        self.full_every = full_every
+        self.keep_full = keep_full
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> List[str]:
+        """Back up every source database
+
+        Returns:
+            Names of the files stored in the target
+        """
+        stored = []
+        async with self._lock:
+            for source in self.sources:
+                if not os.path.exists(source):
+                    print(f"File {source} not found locally, skipping backup.")
+                    continue
+                try:
+                    stored.append(await asyncio.to_thread(self._backup, source))
+                except Exception as e:
+                    print(f"Failed to back up {source}: {e}")
+        return stored
+
+    def _paths(self, source: str):
+        stem = os.path.splitext(os.path.basename(source))[0]
+        base = os.path.join(self.staging_dir, f"{stem}.base.db")
+        state = os.path.join(self.staging_dir, f"{stem}.json")
+        return stem, base, state
+
+    def _backup(self, source: str) -> str:
+        os.makedirs(self.staging_dir, exist_ok=True)
+        stem, base, state_path = self._paths(source)
+        state = {"runs": 0, "sequence": 0}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state.update(json.load(f))
+
+        snapshot = base + ".new"
+        self._snapshot(source, snapshot)
+        # The sequence number orders (and keeps apart) runs within one second
+        name = f"{stem}-{state['sequence'] + 1:08d}-{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}"
+        full = state["runs"] % self.full_every == 0 or not os.path.exists(base)
+        if not full:
+            output = os.path.join(self.staging_dir, f"{name}.delta.gz")
+            full = not write_delta(base, snapshot, output)
+        if full:
+            output = os.path.join(self.staging_dir, f"{name}.full.db.gz")
+            with open(snapshot, "rb") as src, gzip.open(output, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+        try:
+            self.target.put(output)
+        finally:
+            os.remove(output)
+        # The new snapshot only becomes the delta base once it was stored
+        os.replace(snapshot, base)
+        state["runs"] = 1 if full else state["runs"] + 1
+        state["sequence"] += 1
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        try:
+            self._prune(stem)
+        except Exception as e:
+            print(f"Failed to delete old backups of {stem}: {e}")
+        return os.path.basename(output)
+
+    def _prune(self, stem: str) -> None:
+        """Delete the files older than the last `keep_full` full snapshots"""
+        backups = _sorted_backups(self.target.list(f"{stem}-"), stem)
+        fulls = [sequence for sequence, kind, _ in backups if kind == "full.db"]
+        if len(fulls) <= self.keep_full:
+            return
+        oldest_kept = fulls[-self.keep_full]
+        for sequence, _, name in backups:
+            if sequence < oldest_kept:
+                self.target.delete(name)
+
+    def _snapshot(self, source: str, destination: str) -> None:
+        if os.path.exists(destination):
+            os.remove(destination)
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(destination)
+        try:
+            src.backup(dst, pages=self.pages_per_step, sleep=self.step_sleep)
+        finally:
+            dst.close()
+            src.close()
+
+
+def _page_size(path: str) -> int:
+    with open(path, "rb") as f:
+        header = f.read(100)
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+def write_delta(base: str, snapshot: str, output: str) -> bool:
+    """Write the pages of `snapshot` that differ from `base` to a gzip file
+
+    Returns:
+        False if the page sizes differ, in which case no delta is written
+    """
+    page_size = _page_size(snapshot)
+    if _page_size(base) != page_size:
+        return False
+    page_count = os.path.getsize(snapshot) // page_size
+    changed = []
+    with open(base, "rb") as old, open(snapshot, "rb") as new:
+        for number in range(page_count):
+            page = new.read(page_size)
+            if old.read(page_size) != page:
+                changed.append((number, page))
+    with gzip.open(output, "wb") as f:
+        f.write(DELTA_MAGIC)
+        f.write(DELTA_HEADER.pack(page_size, page_count, len(changed)))
+        for number, page in changed:
+            f.write(DELTA_PAGE.pack(number))
+            f.write(page)
+    return True
+
+
+def apply_delta(database: str, delta: str) -> None:
+    """Apply a delta file written by write_delta to a database file"""
+    with gzip.open(delta, "rb") as f:
+        if f.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+            raise ValueError(f"{delta} is not a database delta")
+        page_size, page_count, changed = DELTA_HEADER.unpack(f.read(DELTA_HEADER.size))
+        with open(database, "r+b") as db:
+            for _ in range(changed):
+                (number,) = DELTA_PAGE.unpack(f.read(DELTA_PAGE.size))
+                db.seek(number * page_size)
+                db.write(f.read(page_size))
+            db.truncate(page_count * page_size)
+
+
+def _sorted_backups(names: Iterable[str], stem: str) -> List[Tuple[int, str, str]]:
+    """(sequence, kind, name) of the backup files of a database, oldest first"""
+    return sorted(
+        (int(match["sequence"]), match["kind"], name)
+        for name in names
+        if (match := BACKUP_NAME.match(name)) and match["stem"] == stem
+    )
+
+
+def latest_chain(names: Iterable[str], stem: str) -> Tuple[Optional[str], List[str]]:
+    """Pick the files restoring the newest backup of a database
+
+    Args:
+        names: Names of stored backup files
+        stem: Base name of the database, e.g. "data2"
+
+    Returns:
+        The newest full snapshot (None if there is none) and the deltas taken
+        after it, oldest first
+    """
+    backups = _sorted_backups(names, stem)
+    full, deltas = None, []
+    for _, kind, name in backups:
+        if kind == "full.db":
+            full, deltas = name, []
+        elif full is not None:
+            deltas.append(name)
+    return full, deltas
+
+
+def restore(full: str, deltas: Iterable[str], destination: str) -> None:
+    """Rebuild a database from a full snapshot and the deltas taken after it
+
+    Args:
+        full: Path of the .full.db.gz snapshot
+        deltas: Paths of the following .delta.gz files, oldest first
+        destination: Path of the database file to write
+    """
+    with gzip.open(full, "rb") as src, open(destination, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    for delta in deltas:
+        apply_delta(destination, delta)
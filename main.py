@@ -6,8 +6,9 @@ import json
 from dotenv import load_dotenv
 from utilities import PersistentView
 from utilities.database import Database
+from utilities.message_router import MessageRouter
 import traceback
-from database_backup import upload_database
+from database_backup import BackupManager, GoogleDriveTarget, LOCAL_FILES
 import sys
 import time
 
@@ -27,6 +28,9 @@ intents.message_content = True
 
 prefix = "s!"
 bot = commands.Bot(command_prefix=prefix, intents=intents)
+backups = BackupManager(LOCAL_FILES, GoogleDriveTarget())
+# Single on_message listener; cogs register their handlers with the router
+bot.add_listener(MessageRouter().dispatch, "on_message")
 
 
 def _print(*args, sep=' ', end='\n', delay=0.005):
@@ -97,7 +101,7 @@ async def on_ready():
 
 @tasks.loop(hours=1)
 async def upload_backup():
-    upload_database()
+    await backups.run()
     
 def load_components():
     for file in os.listdir("./templates"):
@@ -0,0 +1,87 @@
+"""Snapshot, delta, retention and restore round-trips of BackupManager"""
+import asyncio
+import os
+import sqlite3
+
+from database_backup import BackupManager, LocalDirectoryTarget, latest_chain, restore
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return list(conn.iterdump())
+    finally:
+        conn.close()
+
+
+def make_manager(tmp_path, source, **kwargs):
+    target = LocalDirectoryTarget(str(tmp_path / "target"))
+    return BackupManager([source], target, staging_dir=str(tmp_path / "staging"), step_sleep=0, **kwargs), target
+
+
+def restore_latest(tmp_path, target, stem):
+    full, deltas = latest_chain(target.list(f"{stem}-"), stem)
+    destination = str(tmp_path / f"{stem}.restored.db")
+    restore(os.path.join(target.directory, full), [os.path.join(target.directory, name) for name in deltas], destination)
+    return destination
+
+
+def test_round_trip(tmp_path):
+    source = str(tmp_path / "data.db")
+    conn = sqlite3.connect(source)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)")
+    conn.commit()
+    manager, target = make_manager(tmp_path, source, full_every=4)
+
+    for run in range(10):
+        # Writes stay in the WAL (no checkpoint) while the backups are taken
+        conn.executemany("INSERT INTO t (value) VALUES (?)", [(f"{run}-{i}" * 20,) for i in range(200)])
+        conn.execute("UPDATE t SET value = ? WHERE id % 7 = ?", (f"updated {run}", run % 7))
+        if run == 6:
+            conn.execute("DELETE FROM t WHERE id > 1000")
+        conn.commit()
+        stored = asyncio.run(manager.run())
+        assert stored[0].endswith(".full.db.gz" if run % 4 == 0 else ".delta.gz")
+        assert dump(restore_latest(tmp_path, target, "data")) == dump(source)
+    conn.close()
+
+
+def test_runs_in_the_same_second_keep_their_order(tmp_path):
+    source = str(tmp_path / "data.db")
+    conn = sqlite3.connect(source)
+    conn.execute("CREATE TABLE t (value TEXT)")
+    manager, target = make_manager(tmp_path, source, full_every=100)
+    for run in range(5):
+        conn.execute("INSERT INTO t VALUES (?)", (str(run),))
+        conn.commit()
+        asyncio.run(manager.run())
+    conn.close()
+
+    assert len(target.list("data-")) == 5
+    assert dump(restore_latest(tmp_path, target, "data")) == dump(source)
+
+
+def test_retention(tmp_path):
+    source = str(tmp_path / "data.db")
+    other = str(tmp_path / "data2.db")
+    for path in (source, other):
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE t (value TEXT)")
+        conn.commit()
+        conn.close()
+    manager, target = make_manager(tmp_path, source, full_every=3, keep_full=2)
+    manager.sources.append(other)
+
+    conn = sqlite3.connect(source)
+    for run in range(10):
+        conn.execute("INSERT INTO t VALUES (?)", (str(run),))
+        conn.commit()
+        asyncio.run(manager.run())
+    conn.close()
+
+    # Runs 1-10 with fulls at 1, 4, 7 and 10: the fulls 7 and 10 and the deltas 8 and 9 remain
+    names = sorted(target.list("data-"))
+    assert [name.split("-")[1] for name in names] == ["00000007", "00000008", "00000009", "00000010"]
+    assert len(target.list("data2-")) == 4
+    assert dump(restore_latest(tmp_path, target, "data")) == dump(source)
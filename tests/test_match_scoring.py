@@ -0,0 +1,145 @@
+"""Parity of the batch scorer with the per-pair MatchSySystems.compare_users"""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from cogs.match import MatchSySystems
+from utilities.match_scoring import ProfileColumns
+
+GUILD_ID = 1
+
+
+class FakeLoop:
+    """Loop stand-in for the cog constructor; the match history is not loaded"""
+
+    @staticmethod
+    def create_task(coro):
+        coro.close()
+
+
+@pytest.fixture(scope="module")
+def cog():
+    return MatchSySystems(SimpleNamespace(guilds=[], loop=FakeLoop()))
+
+
+def make_member(cog, rng, member_id, guild=None, **fixed):
+    """Build a member with random matchmaking roles
+
+    Every category is left unset now and then. `fixed` maps a profile field to
+    the value the member must hold, None to hold no role of that field.
+    """
+    roles = []
+    for field, table in role_tables(cog).items():
+        if field in fixed:
+            if fixed[field] is not None:
+                roles.append(table[fixed[field]])
+        elif field in cog.multi_value_fields:
+            roles.extend(rng.sample(list(table.values()), rng.randint(0, len(table))))
+        elif rng.random() < 0.8:
+            roles.append(rng.choice(list(table.values())))
+    rng.shuffle(roles)
+    return SimpleNamespace(id=member_id, bot=False, guild=guild, roles=[SimpleNamespace(id=role_id) for role_id in roles])
+
+
+def role_tables(cog):
+    """Profile field -> (value -> role id) of every matchmaking role"""
+    weights = cog.category_weights
+    return {
+        'gender': weights["Gender"]["roles"],
+        'age': cog.age_roles,
+        'height': cog.height_roles,
+        'region': cog.region,
+        'personality': cog.personality,
+        'relationship_status': weights["Relationship Status"]["roles"],
+        'dms_status': weights["Dms Status"]["roles"],
+        'height_preference': weights["Height Preference"]["roles"],
+        'age_preference': weights["Age Preference"]["roles"],
+        'distance_preference': weights["Distance Preference"]["roles"],
+        'personality_preference': weights["Personality Preference"]["roles"],
+        'hobbies': weights["Hobbies and Interests"]["roles"],
+    }
+
+
+def assert_parity(cog, requesters, profiles, columns):
+    for user_data in requesters:
+        scores = cog.scorer.score(user_data, columns)
+        expected = [cog.compare_users(user_data, profiles[member_id]) for member_id in columns.member_ids.tolist()]
+        assert scores.tolist() == expected
+
+
+def test_random_profiles(cog):
+    rng = random.Random(665)
+    profiles = {member_id: cog.extract_user_data(make_member(cog, rng, member_id)) for member_id in range(1, 3001)}
+    columns = ProfileColumns.from_profiles(cog.encoder, profiles.items())
+    requesters = [cog.extract_user_data(make_member(cog, rng, 0)) for _ in range(200)]
+    assert_parity(cog, requesters, profiles, columns)
+
+
+@pytest.mark.parametrize("field", ['age', 'height', 'region', 'age_preference', 'height_preference', 'distance_preference'])
+def test_unset_fields(cog, field):
+    rng = random.Random(field)
+    profiles = {member_id: cog.extract_user_data(make_member(cog, rng, member_id, **{field: None})) for member_id in range(1, 501)}
+    profiles.update({member_id: cog.extract_user_data(make_member(cog, rng, member_id)) for member_id in range(501, 1001)})
+    columns = ProfileColumns.from_profiles(cog.encoder, profiles.items())
+    requesters = [cog.extract_user_data(make_member(cog, rng, 0, **{field: None})) for _ in range(20)]
+    requesters += [cog.extract_user_data(make_member(cog, rng, 0)) for _ in range(20)]
+    assert_parity(cog, requesters, profiles, columns)
+
+
+@pytest.mark.parametrize("field, value", [
+    ('dms_status', "dms closed"),
+    ('relationship_status', "taken"),
+    ('relationship_status', "not looking"),
+])
+def test_excluded_members_score_zero(cog, field, value):
+    rng = random.Random(value)
+    profiles = {member_id: cog.extract_user_data(make_member(cog, rng, member_id, **{field: value})) for member_id in range(1, 301)}
+    columns = ProfileColumns.from_profiles(cog.encoder, profiles.items())
+    requesters = [cog.extract_user_data(make_member(cog, rng, 0)) for _ in range(20)]
+    assert_parity(cog, requesters, profiles, columns)
+    for user_data in requesters:
+        assert not cog.scorer.score(user_data, columns).any()
+
+
+@pytest.mark.parametrize("personality, preference", [
+    ("optimist", "optimistic"),
+    ("realistic", "realist"),
+    ("introvert", "introvert"),
+])
+def test_personality_names(cog, personality, preference):
+    """Personality roles are matched by name, so differently named ones never overlap"""
+    rng = random.Random(personality)
+    member = cog.extract_user_data(make_member(cog, rng, 1, personality=None))
+    member['personality'] = cog.encoder.mask('personality', [personality])
+    user_data = cog.extract_user_data(make_member(cog, rng, 0, personality_preference=None))
+    user_data['personality_preference'] = cog.encoder.mask('personality_preference', [preference])
+    columns = ProfileColumns.from_profiles(cog.encoder, [(1, member)])
+    assert_parity(cog, [user_data], {1: member}, columns)
+
+    without = dict(user_data, personality_preference=0)
+    shared = cog.compare_users(user_data, member) - cog.compare_users(without, member)
+    assert shared == (cog.category_weights["Personality Preference"]["score"] if personality == preference else 0)
+
+
+def test_store_updates(cog):
+    rng = random.Random(7)
+    guild = SimpleNamespace(id=GUILD_ID, members=[])
+    guild.members = [make_member(cog, rng, member_id, guild) for member_id in range(1, 2001)]
+    cog.profiles.load_guild(guild)
+    for _ in range(2000):
+        member = rng.choice(guild.members)
+        if rng.random() < 0.1:
+            cog.profiles.remove(member)
+        else:
+            member.roles = make_member(cog, rng, member.id).roles
+            cog.profiles.update(member)
+
+    profiles = dict(cog.profiles.members(GUILD_ID))
+    requesters = [cog.extract_user_data(make_member(cog, rng, 0)) for _ in range(50)]
+    for gender in ("male", "female"):
+        columns = cog.profiles.candidates(GUILD_ID, gender)
+        expected = {member_id for member_id, profile in profiles.items() if profile['gender'] == gender and cog.is_candidate(profile)}
+        assert set(columns.member_ids.tolist()) == expected
+        assert_parity(cog, requesters, profiles, columns)
+    cog.profiles.unload_guild(GUILD_ID)
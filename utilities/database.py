@@ -1,7 +1,49 @@
 import aiosqlite
 import asyncio
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from utilities.leaderboard import Leaderboard
+from utilities.query_stats import QueryStats
+from utilities import schema
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+# Generated statements are cached per (table, column set), so hot write paths
+# skip rebuilding the same SQL strings on every call.
+@lru_cache(maxsize=512)
+def _insert_sql(table: str, columns: Tuple[str, ...], replace: bool) -> str:
+    cmd = "REPLACE INTO" if replace else "INSERT INTO"
+    return f"{cmd} {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
+
+@lru_cache(maxsize=512)
+def _update_sql(table: str, columns: Tuple[str, ...], condition: str) -> str:
+    return f"UPDATE {table} SET {', '.join([f'{c} = ?' for c in columns])} WHERE {condition}"
+
+
+@lru_cache(maxsize=512)
+def _delete_sql(table: str, condition: str) -> str:
+    return f"DELETE FROM {table} WHERE {condition}"
+
+
+@lru_cache(maxsize=512)
+def _upsert_sql(table: str, columns: Tuple[str, ...], key_columns: Tuple[str, ...]) -> str:
+    non_key_columns = [c for c in columns if c not in key_columns]
+    if non_key_columns:
+        conflict_action = f"DO UPDATE SET {', '.join([f'{c} = excluded.{c}' for c in non_key_columns])}"
+    else:
+        conflict_action = "DO NOTHING"
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(key_columns)}) {conflict_action}"
+    )
+
+
+@lru_cache(maxsize=512)
+def _select_column_sql(table: str, column: str, key_column: str) -> str:
+    return f"SELECT {column} FROM {table} WHERE {key_column} = ?"
 
 
 class Database:
@@ -17,57 +59,53 @@ class Database:
         return cls._instance
     
     def __init__(self, db_path: str = "database/data2.db", **kwargs):
-        """Initialize the database connection"""
+        """Initialize the database connection settings
+        
+        Connections are opened lazily: one writer connection, guarded by a lock,
+        and a pool of `readers` reader connections. The database runs in WAL mode
+        so readers proceed concurrently with each other and with the writer.
+        """
         if self._initialized:
             return
             
         self.db_path = db_path
         self.timeout = kwargs.get('timeout', 30.0)
-        self._pool = None
+        self.readers = kwargs.get('readers', 4)
+        # Compiled statements kept per connection by sqlite3; sized to hold
+        # every query template the bot issues
+        self.cached_statements = kwargs.get('cached_statements', 256)
+        self._pool: Optional[asyncio.Queue] = None
+        self._pool_connections: List[aiosqlite.Connection] = []
+        self._pool_lock = asyncio.Lock()
         self._connection = None
         self._lock = asyncio.Lock()
+        # Guards opening the writer, which both the writer lock holders and
+        # the reader pool (before opening readers) may request
+        self._connect_lock = asyncio.Lock()
+        # Group commit of queued writes (see queue_write)
+        self.batch_window = kwargs.get('batch_window', 0.05)
+        self.batch_size = kwargs.get('batch_size', 500)
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # In-memory XP standings of the guilds whose leaderboard was requested
+        self._leaderboards: Dict[int, Leaderboard] = {}
+        self._leaderboards_version = 0
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+        # Per-query timings, off unless enabled here or at runtime (/dbstats)
+        self.stats = QueryStats(
+            enabled=kwargs.get('instrument', False),
+            slow_threshold=kwargs.get('slow_query_threshold', 0.1)
+        )
         Database._initialized = True
     
     async def init_database(self, bot = None):
         """Initialize all database tables
         
         This method should be called when the bot starts to ensure all tables exist.
+        Tables are declared in utilities.schema; see ensure_schema.
         """
-        # User levels system
-        await self.create_table("user_levels", """
-            user_id INTEGER,
-            guild_id INTEGER,
-            xp INTEGER DEFAULT 0,
-            level INTEGER DEFAULT 0,
-            last_message TIMESTAMP,
-            PRIMARY KEY (user_id, guild_id)
-        """)
-        
-        await self.create_table("level_settings", """
-            guild_id INTEGER PRIMARY KEY,
-            announcement_channel INTEGER,
-            level_up_message TEXT,
-            is_enabled BOOLEAN DEFAULT 1,
-            xp_blacklist TEXT DEFAULT "[]"
-        """)
-        
-        # Threading system
-        await self.create_table("threading", """
-            guild_id INTEGER PRIMARY KEY,
-            thread_channel TEXT
-        """)
-        
-        # Stick messages system
-        await self.create_table("stick_messages", """
-            guild_id INTEGER PRIMARY KEY,
-            stick_messages TEXT
-        """)
-        
-        # User notification settings
-        await self.create_table("user_settings", """
-            user_id INTEGER PRIMARY KEY,
-            dm_notif TEXT
-        """)
+        await self.ensure_schema()
 
         if bot:
             from utilities import PersistentView
@@ -86,18 +124,91 @@ class Database:
             except Exception as e:
                 print(f"Error loading persistent views: {e}")
     
+    async def ensure_schema(self) -> None:
+        """Make sure the schema declared in utilities.schema is in place
+        
+        Runs the table/index DDL and pending migrations only when the database's
+        user_version is older than SCHEMA_VERSION; afterwards it is a no-op for
+        the rest of the process, so cogs can call it freely on load.
+        """
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if self._schema_ready:
+                return
+            version = await self.fetchvalue("PRAGMA user_version") or 0
+            if version < schema.SCHEMA_VERSION:
+                async with self._lock:
+                    conn = await self._get_connection()
+                    try:
+                        for table, columns in schema.TABLES.items():
+                            await conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+                        for index, target in schema.INDEXES.items():
+                            await conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {target}")
+                        for step in range(version + 1, schema.SCHEMA_VERSION + 1):
+                            for migration in schema.MIGRATIONS.get(step, []):
+                                if callable(migration):
+                                    await migration(conn)
+                                else:
+                                    await conn.execute(migration)
+                        await conn.execute(f"PRAGMA user_version = {schema.SCHEMA_VERSION}")
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+            self._schema_ready = True
+    
+    async def _connect(self) -> aiosqlite.Connection:
+        """Open a new connection configured for WAL mode"""
+        conn = await aiosqlite.connect(self.db_path, timeout=self.timeout, cached_statements=self.cached_statements)
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
     async def _get_connection(self) -> aiosqlite.Connection:
-        """Get a database connection"""
+        """Get the writer connection, opening it once on first use"""
         if self._connection is None:
-            self._connection = await aiosqlite.connect(self.db_path, timeout=self.timeout)
-            self._connection.row_factory = aiosqlite.Row
+            async with self._connect_lock:
+                if self._connection is None:
+                    self._connection = await self._connect()
         return self._connection
     
+    async def _get_pool(self) -> asyncio.Queue:
+        """Get the pool of reader connections, opening it on first use"""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    # The writer switches the database file to WAL before readers open it
+                    await self._get_connection()
+                    pool = asyncio.Queue()
+                    for _ in range(self.readers):
+                        conn = await self._connect()
+                        self._pool_connections.append(conn)
+                        pool.put_nowait(conn)
+                    self._pool = pool
+        return self._pool
+    
+    @asynccontextmanager
+    async def _reader(self):
+        """Borrow a reader connection from the pool"""
+        pool = await self._get_pool()
+        conn = await pool.get()
+        try:
+            yield conn
+        finally:
+            pool.put_nowait(conn)
+    
     async def close(self) -> None:
-        """Close the database connection"""
+        """Commit queued writes, then close the writer and every reader connection"""
+        await self.flush()
         if self._connection is not None:
             await self._connection.close()
             self._connection = None
+        for conn in self._pool_connections:
+            await conn.close()
+        self._pool_connections = []
+        self._pool = None
     
     async def execute(self, query: str, params: tuple = (), *, commit: bool = True) -> Optional[int]:
         """Execute a database query
@@ -110,12 +221,117 @@ class Database:
         Returns:
             The rowid of the last inserted row or None
         """
+        started = time.perf_counter()
         async with self._lock:
+            acquired = time.perf_counter()
             conn = await self._get_connection()
             cursor = await conn.execute(query, params)
             if commit:
                 await conn.commit()
-            return cursor.lastrowid
+        self.stats.record(query, acquired - started, time.perf_counter() - acquired, cursor.rowcount)
+        return cursor.lastrowid
+    
+    def queue_write(self, query: str, params: tuple = ()) -> asyncio.Future:
+        """Queue a write to be committed together with other queued writes
+        
+        Writes queued within `batch_window` seconds (or up to `batch_size` of
+        them) are executed in a single transaction with one commit. Callers that
+        need durability await the returned future; others can ignore it.
+        
+        Args:
+            query: SQL query to execute
+            params: Parameters for the query
+            
+        Returns:
+            A future resolving to the rowid of the last inserted row once the
+            batch has committed, or raising the error of this statement
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._write_queue is None:
+            self._write_queue = asyncio.Queue()
+        self._write_queue.put_nowait((query, params, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_writes())
+        return future
+    
+    async def _flush_writes(self) -> None:
+        """Drain the write queue batch by batch until it is empty
+        
+        If the flusher itself dies (e.g. it is cancelled), every write still
+        queued or in the current batch fails instead of waiting forever.
+        """
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while not self._write_queue.empty():
+                batch = [self._write_queue.get_nowait()]
+                deadline = loop.time() + self.batch_window
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                await self._commit_batch(batch)
+                batch = []
+        except BaseException as e:
+            while not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            self._fail_writes(batch, e)
+            raise
+    
+    @staticmethod
+    def _fail_writes(batch: List[Tuple[str, tuple, asyncio.Future]], error: BaseException) -> None:
+        """Resolve the still pending futures of queued writes with an error"""
+        for _, _, future in batch:
+            if future.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
+    
+    async def _commit_batch(self, batch: List[Tuple[str, tuple, asyncio.Future]]) -> None:
+        """Execute a batch of queued writes in one transaction and resolve their futures"""
+        results = []
+        started = time.perf_counter()
+        try:
+            async with self._lock:
+                acquired = time.perf_counter()
+                conn = await self._get_connection()
+                for query, params, future in batch:
+                    executed = time.perf_counter()
+                    try:
+                        cursor = await conn.execute(query, params)
+                        results.append((future, cursor.lastrowid, None))
+                        self.stats.record(query, acquired - started, time.perf_counter() - executed, cursor.rowcount)
+                    except Exception as e:
+                        results.append((future, None, e))
+                try:
+                    await conn.commit()
+                except Exception as e:
+                    results = [(future, None, e) for future, _, _ in results]
+                    await conn.rollback()
+        except Exception as e:
+            # The connection could not be opened or rolled back
+            self._fail_writes(batch, e)
+            return
+        
+        for future, rowid, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(rowid)
+    
+    async def flush(self) -> None:
+        """Wait until every queued write has been committed"""
+        if self._flusher is not None and not self._flusher.done():
+            await asyncio.shield(self._flusher)
     
     async def executemany(self, query: str, params_list: List[tuple], *, commit: bool = True) -> None:
         """Execute a database query with multiple parameter sets
@@ -125,11 +341,14 @@ class Database:
             params_list: List of parameter tuples for the query
             commit: Whether to commit after execution
         """
+        started = time.perf_counter()
         async with self._lock:
+            acquired = time.perf_counter()
             conn = await self._get_connection()
-            await conn.executemany(query, params_list)
+            cursor = await conn.executemany(query, params_list)
             if commit:
                 await conn.commit()
+        self.stats.record(query, acquired - started, time.perf_counter() - acquired, cursor.rowcount)
     
     async def execute_script(self, script: str, *, commit: bool = True) -> None:
         """Execute a multi-statement SQL script
@@ -138,11 +357,14 @@ class Database:
             script: SQL script to execute
             commit: Whether to commit after execution
         """
+        started = time.perf_counter()
         async with self._lock:
+            acquired = time.perf_counter()
             conn = await self._get_connection()
             await conn.executescript(script)
             if commit:
                 await conn.commit()
+        self.stats.record(script, acquired - started, time.perf_counter() - acquired, 0)
     
     async def fetchone(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """Fetch a single row from the database
@@ -154,13 +376,13 @@ class Database:
         Returns:
             The first row as a dictionary or None if no rows were returned
         """
-        async with self._lock:
-            conn = await self._get_connection()
+        started = time.perf_counter()
+        async with self._reader() as conn:
+            acquired = time.perf_counter()
             async with conn.execute(query, params) as cursor:
                 row = await cursor.fetchone()
-                if row:
-                    return dict(row)
-                return None
+        self.stats.record(query, acquired - started, time.perf_counter() - acquired, 1 if row else 0)
+        return dict(row) if row else None
     
     async def fetchall(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Fetch all rows from the database
@@ -172,11 +394,13 @@ class Database:
         Returns:
             All rows as a list of dictionaries
         """
-        async with self._lock:
-            conn = await self._get_connection()
+        started = time.perf_counter()
+        async with self._reader() as conn:
+            acquired = time.perf_counter()
             async with conn.execute(query, params) as cursor:
                 rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+        self.stats.record(query, acquired - started, time.perf_counter() - acquired, len(rows))
+        return [dict(row) for row in rows]
     
     async def fetchvalue(self, query: str, params: tuple = ()) -> Any:
         """Fetch a single value from the database
@@ -188,13 +412,13 @@ class Database:
         Returns:
             The first column of the first row or None if no rows were returned
         """
-        async with self._lock:
-            conn = await self._get_connection()
+        started = time.perf_counter()
+        async with self._reader() as conn:
+            acquired = time.perf_counter()
             async with conn.execute(query, params) as cursor:
                 row = await cursor.fetchone()
-                if row:
-                    return row[0]
-                return None
+        self.stats.record(query, acquired - started, time.perf_counter() - acquired, 1 if row else 0)
+        return row[0] if row else None
     
     async def transaction(self):
         """Create a transaction context manager
@@ -215,15 +439,23 @@ class Database:
                 self.conn = None
             
             async def __aenter__(self):
-                self.conn = await self.db._get_connection()
-                await self.conn.execute("BEGIN TRANSACTION")
+                await self.db._lock.acquire()
+                try:
+                    self.conn = await self.db._get_connection()
+                    await self.conn.execute("BEGIN TRANSACTION")
+                except BaseException:
+                    self.db._lock.release()
+                    raise
                 return self.conn
             
             async def __aexit__(self, exc_type, exc_val, exc_tb):
-                if exc_type is None:
-                    await self.conn.commit()
-                else:
-                    await self.conn.rollback()
+                try:
+                    if exc_type is None:
+                        await self.conn.commit()
+                    else:
+                        await self.conn.rollback()
+                finally:
+                    self.db._lock.release()
         
         return Transaction(self)
     
@@ -257,6 +489,12 @@ class Database:
         """
         await self.execute(query)
     
+    def _table_changed(self, table: str) -> None:
+        """Drop the in-memory state derived from a table that was just written"""
+        if table == "user_levels":
+            self._leaderboards_version += 1
+            self._leaderboards.clear()
+    
     async def insert(self, table: str, data: Dict[str, Any], *, replace: bool = False) -> int:
         """Insert a row into a table
         
@@ -268,14 +506,10 @@ class Database:
         Returns:
             The rowid of the inserted row
         """
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['?'] * len(data))
-        values = tuple(data.values())
-        
-        cmd = "REPLACE INTO" if replace else "INSERT INTO"
-        query = f"{cmd} {table} ({columns}) VALUES ({placeholders})"
-        
-        return await self.execute(query, values)
+        query = _insert_sql(table, tuple(data.keys()), replace)
+        rowid = await self.execute(query, tuple(data.values()))
+        self._table_changed(table)
+        return rowid
     
     async def update(self, table: str, data: Dict[str, Any], condition: str, condition_params: tuple) -> None:
         """Update rows in a table
@@ -286,11 +520,9 @@ class Database:
             condition: WHERE condition
             condition_params: Parameters for the condition
         """
-        set_clause = ', '.join([f"{key} = ?" for key in data.keys()])
-        values = tuple(data.values()) + condition_params
-        
-        query = f"UPDATE {table} SET {set_clause} WHERE {condition}"
-        await self.execute(query, values)
+        query = _update_sql(table, tuple(data.keys()), condition)
+        await self.execute(query, tuple(data.values()) + condition_params)
+        self._table_changed(table)
     
     async def delete(self, table: str, condition: str, params: tuple) -> None:
         """Delete rows from a table
@@ -300,36 +532,33 @@ class Database:
             condition: WHERE condition
             params: Parameters for the condition
         """
-        query = f"DELETE FROM {table} WHERE {condition}"
-        await self.execute(query, params)
+        await self.execute(_delete_sql(table, condition), params)
+        self._table_changed(table)
     
-    async def upsert(self, table: str, data: Dict[str, Any], key_columns: List[str]) -> None:
-        """Insert or update a row in a table
+    async def upsert(self, table: str, data: Union[Dict[str, Any], List[Dict[str, Any]]], key_columns: List[str]) -> None:
+        """Insert or update one or more rows in a table
+        
+        Runs a single INSERT ... ON CONFLICT DO UPDATE statement (executed once
+        per row for a batch), so the operation is atomic and needs no SELECT.
+        The key columns must be the table's primary key or a unique index.
         
         Args:
             table: Table to insert/update
-            data: Dictionary of column names and values
+            data: Dictionary of column names and values, or a list of them
+                (all with the same columns) for a bulk upsert
             key_columns: List of column names that form the primary key
         """
-        key_data = {k: data[k] for k in key_columns}
-        
-        where_clause = ' AND '.join([f"{key} = ?" for key in key_data.keys()])
-        existing = await self.fetchone(
-            f"SELECT 1 FROM {table} WHERE {where_clause}",
-            tuple(key_data.values())
-        )
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return
         
-        if existing:
-            non_key_data = {k: v for k, v in data.items() if k not in key_columns}
-            if non_key_data:
-                await self.update(
-                    table,
-                    non_key_data,
-                    where_clause,
-                    tuple(key_data.values())
-                )
+        columns = tuple(rows[0].keys())
+        query = _upsert_sql(table, columns, tuple(key_columns))
+        if len(rows) == 1:
+            await self.execute(query, tuple(rows[0][c] for c in columns))
         else:
-            await self.insert(table, data)
+            await self.executemany(query, [tuple(row[c] for c in columns) for row in rows])
+        self._table_changed(table)
     
     async def json_get(self, table: str, key_column: str, key_value: Any, data_column: str) -> Any:
         """Get a JSON value from the database
@@ -343,7 +572,7 @@ class Database:
         Returns:
             The parsed JSON data or None
         """
-        query = f"SELECT {data_column} FROM {table} WHERE {key_column} = ?"
+        query = _select_column_sql(table, data_column, key_column)
         result = await self.fetchvalue(query, (key_value,))
         
         if result:
@@ -355,30 +584,27 @@ class Database:
         
         Args:
             table: Table to update
-            key_column: Column to filter on
+            key_column: Column to filter on (primary key or unique)
             key_value: Value to filter for
             data_column: Column to store the JSON data
             data: Data to store (will be converted to JSON)
         """
-        json_data = json.dumps(data)
+        await self.upsert(table, {key_column: key_value, data_column: json.dumps(data)}, [key_column])
+    
+    async def json_set_many(self, table: str, key_column: str, data_column: str, items: Dict[Any, Any]) -> None:
+        """Set several JSON values in the database in one batch
         
-        exists = await self.fetchvalue(
-            f"SELECT 1 FROM {table} WHERE {key_column} = ?",
-            (key_value,)
+        Args:
+            table: Table to update
+            key_column: Column to filter on (primary key or unique)
+            data_column: Column to store the JSON data
+            items: Dictionary of key values to data (converted to JSON)
+        """
+        await self.upsert(
+            table,
+            [{key_column: key_value, data_column: json.dumps(data)} for key_value, data in items.items()],
+            [key_column]
         )
-        
-        if exists:
-            await self.update(
-                table,
-                {data_column: json_data},
-                f"{key_column} = ?",
-                (key_value,)
-            )
-        else:
-            await self.insert(
-                table,
-                {key_column: key_value, data_column: json_data}
-            )
     
     async def get_user_level(self, user_id: int, guild_id: int) -> Tuple[int, int, Optional[int]]:
         """Get a user's XP level information
@@ -398,19 +624,57 @@ class Database:
         if not user_data:
             return (0, 0, None)
         
-        rank_data = await self.fetchall(
-            "SELECT user_id FROM user_levels WHERE guild_id = ? ORDER BY xp DESC",
-            (guild_id,)
+        # Always ranked from the table, which every write path keeps current
+        rank = await self.fetchvalue(
+            "SELECT COUNT(*) + 1 FROM user_levels WHERE guild_id = ? AND xp > ?",
+            (guild_id, user_data['xp'])
         )
         
-        rank = None
-        for i, row in enumerate(rank_data):
-            if row['user_id'] == user_id:
-                rank = i + 1
-                break
-        
         return (user_data['level'], user_data['xp'], rank)
     
+    async def set_user_xp(self, user_id: int, guild_id: int, xp: int, level: int) -> None:
+        """Set a user's XP and level, keeping the guild's leaderboard in sync
+        
+        Args:
+            user_id: Discord user ID
+            guild_id: Discord guild ID
+            xp: New XP amount
+            level: New level
+        """
+        # Executed directly so the generic write paths don't drop the leaderboard
+        query = _upsert_sql("user_levels", ("user_id", "guild_id", "xp", "level"), ("user_id", "guild_id"))
+        await self.execute(query, (user_id, guild_id, xp, level))
+        leaderboard = self._leaderboards.get(guild_id)
+        if leaderboard is not None:
+            leaderboard.set(user_id, xp)
+    
+    async def get_leaderboard(self, guild_id: int) -> Leaderboard:
+        """Get the in-memory XP standings of a guild
+        
+        The standings are loaded from the database on first use and kept in
+        sync by set_user_xp. Writes to user_levels through insert, update,
+        delete or upsert drop every loaded leaderboard, which is then reloaded
+        on next use; raw execute calls must not write XP.
+        
+        Args:
+            guild_id: Discord guild ID
+            
+        Returns:
+            The guild's Leaderboard
+        """
+        leaderboard = self._leaderboards.get(guild_id)
+        if leaderboard is None:
+            version = self._leaderboards_version
+            rows = await self.fetchall(
+                "SELECT user_id, xp FROM user_levels WHERE guild_id = ?",
+                (guild_id,)
+            )
+            leaderboard = Leaderboard((row['user_id'], row['xp']) for row in rows)
+            # Not cached if user_levels was written while loading
+            if version == self._leaderboards_version:
+                self._leaderboards[guild_id] = leaderboard
+        return leaderboard
+    
     async def get_auto_thread_channels(self, guild_id: int) -> Dict[str, Dict[str, Any]]:
         """Get the auto thread channels for a guild
         
@@ -429,6 +693,19 @@ class Database:
             return json.loads(result)
         return {}
     
+    async def get_all_auto_thread_channels(self) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        """Get the auto thread channels of every guild
+        
+        Returns:
+            Dictionary of guild IDs to their channel IDs to thread settings
+        """
+        rows = await self.fetchall("SELECT guild_id, thread_channel FROM threading")
+        return {
+            row['guild_id']: json.loads(row['thread_channel'])
+            for row in rows
+            if row['thread_channel']
+        }
+    
     async def save_auto_thread_channels(self, guild_id: int, channels: Dict[str, Dict[str, Any]]) -> None:
         """Save the auto thread channels for a guild
         
@@ -436,4 +713,84 @@ class Database:
             guild_id: Discord guild ID
             channels: Dictionary of channel IDs to thread settings
         """
-        await self.json_set('threading', 'guild_id', guild_id, 'thread_channel', channels) 
\ No newline at end of file
+        await self.json_set('threading', 'guild_id', guild_id, 'thread_channel', channels)
+    
+    async def add_match(self, guild_id: int, requester_id: int, candidate_id: int, matched_at: int) -> None:
+        """Record a match in the match history
+        
+        Args:
+            guild_id: Discord guild ID
+            requester_id: ID of the user who asked for a match
+            candidate_id: ID of the matched user
+            matched_at: Unix timestamp of the match
+        """
+        await self.insert("match_history", {
+            "guild_id": guild_id,
+            "requester_id": requester_id,
+            "candidate_id": candidate_id,
+            "matched_at": matched_at
+        })
+    
+    async def get_recent_matches(self, limit: int) -> List[Dict[str, Any]]:
+        """Get the most recent matches of all guilds
+        
+        Args:
+            limit: Maximum number of matches to return
+            
+        Returns:
+            List of match rows, newest first
+        """
+        return await self.fetchall(
+            "SELECT guild_id, requester_id, candidate_id, matched_at FROM match_history "
+            "ORDER BY matched_at DESC, rowid DESC LIMIT ?",
+            (limit,)
+        )
+    
+    async def get_user_matches(self, guild_id: int, requester_id: int, limit: int) -> List[int]:
+        """Get the most recent candidates matched with a requester
+        
+        Args:
+            guild_id: Discord guild ID
+            requester_id: ID of the user who asked for matches
+            limit: Maximum number of candidates to return
+            
+        Returns:
+            List of candidate IDs, newest first
+        """
+        rows = await self.fetchall(
+            "SELECT candidate_id FROM match_history WHERE guild_id = ? AND requester_id = ? "
+            "ORDER BY matched_at DESC, rowid DESC LIMIT ?",
+            (guild_id, requester_id, limit)
+        )
+        return [row['candidate_id'] for row in rows]
+
+    async def prune_matches(self, per_user: int, per_guild: int) -> int:
+        """Delete the match history rows no exclusion needs anymore
+
+        A row is kept while it is among the latest `per_user` matches of its
+        requester or the latest `per_guild` matches of its guild.
+
+        Args:
+            per_user: Number of matches to keep per requester
+            per_guild: Number of matches to keep per guild
+
+        Returns:
+            Number of deleted rows
+        """
+        query = (
+            "DELETE FROM match_history WHERE rowid IN ("
+            "SELECT rowid FROM ("
+            "SELECT rowid, "
+            "ROW_NUMBER() OVER (PARTITION BY guild_id, requester_id ORDER BY matched_at DESC, rowid DESC) AS user_rank, "
+            "ROW_NUMBER() OVER (PARTITION BY guild_id ORDER BY matched_at DESC, rowid DESC) AS guild_rank "
+            "FROM match_history"
+            ") WHERE user_rank > ? AND guild_rank > ?)"
+        )
+        started = time.perf_counter()
+        async with self._lock:
+            acquired = time.perf_counter()
+            conn = await self._get_connection()
+            cursor = await conn.execute(query, (per_user, per_guild))
+            await conn.commit()
+        self.stats.record(query, acquired - started, time.perf_counter() - acquired, cursor.rowcount)
+        return cursor.rowcount
@@ -4,6 +4,7 @@ import time
 from utilities.components_callback import DropDownSelect, CustomButton 
 import os
 import json
+import string
 
 
 class PersistentView(discord.ui.View):
@@ -70,12 +71,165 @@ class PersistentView(discord.ui.View):
 def content_format(content):
     return "\n".join(content) if isinstance(content, list) else content
 
-def get_message_from_template(template_name, variables = {}):
-    
+
+class FormatString:
+    """A template string split once into literal text and format fields
+
+    Rendering with plain `{name}` fields only joins the literals with the
+    formatted variables; fields using attributes, indexes, conversions or
+    format specs fall back to str.format. Like str.format, a missing variable
+    raises KeyError.
+    """
+    __slots__ = ("text", "parts", "constant")
+
+    _formatter = string.Formatter()
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = []
+        self.constant = None
+        simple = True
+        for literal, field, spec, conversion in self._formatter.parse(text):
+            if literal:
+                self.parts.append((True, literal))
+            if field is not None:
+                if spec or conversion or not field.isidentifier():
+                    simple = False
+                self.parts.append((False, field))
+        if not simple:
+            self.parts = None
+        elif all(is_literal for is_literal, _ in self.parts):
+            self.constant = "".join(value for _, value in self.parts)
+
+    def render(self, variables):
+        if self.constant is not None:
+            return self.constant
+        if self.parts is None:
+            return self.text.format(**variables)
+        return "".join(value if is_literal else format(variables[value]) for is_literal, value in self.parts)
+
+
+def _compile_color(color):
+    return color if isinstance(color, int) else int(color.lstrip("#"), 16)
+
+
+def _compile_embed(embed):
+    compiled = {
+        "title": FormatString(content_format(embed.get("title", ""))),
+        "description": FormatString(content_format(embed.get("description", ""))),
+        "color": _compile_color(embed.get("color", "#ff4af0")),
+        "author": None,
+        "fields": [],
+        "thumbnail": None,
+        "image": None,
+        "footer": None,
+        "timestamp": None,
+    }
+    if "author" in embed and embed["author"] is not None:
+        compiled["author"] = (
+            FormatString(content_format(embed["author"].get("name", ""))),
+            FormatString(embed["author"].get("url", "")),
+            FormatString(embed["author"].get("icon_url", ""))
+        )
+    if "fields" in embed and embed["fields"] is not None:
+        compiled["fields"] = [
+            (
+                FormatString(content_format(field.get("name", ""))),
+                FormatString(content_format(field.get("value", ""))),
+                field.get("inline", False)
+            )
+            for field in embed["fields"]
+        ]
+    for key in ("thumbnail", "image"):
+        if key in embed and embed[key] is not None:
+            value = embed[key]
+            compiled[key] = FormatString(value.get("url", "") if isinstance(value, dict) else value)
+    if "footer" in embed and embed["footer"] is not None:
+        compiled["footer"] = (
+            FormatString(content_format(embed["footer"].get("text", ""))),
+            FormatString(embed["footer"].get("icon_url", ""))
+        )
+    if "timestamp" in embed and embed["timestamp"] is not None:
+        timestamp = embed["timestamp"]
+        # "now" is resolved at render time
+        if timestamp == "{timestamp}":
+            compiled["timestamp"] = "now"
+        elif isinstance(timestamp, (int, float)):
+            compiled["timestamp"] = timestamp
+        else:
+            compiled["timestamp"] = "none"
+    return compiled
+
+
+class CompiledTemplate:
+    """A message template parsed once, rendered into fresh discord objects per call"""
+
+    def __init__(self, template):
+        self.content = None
+        if "content" in template and template["content"] is not None:
+            self.content = FormatString(content_format(template["content"]))
+        self.embeds = [_compile_embed(embed) for embed in template.get("embeds") or []]
+        self.components = template.get("components")
+
+    def render(self, variables):
+        content = self.content.render(variables) if self.content is not None else ""
+        embeds = []
+        for embed in self.embeds:
+            discord_embed = discord.Embed(
+                title=embed["title"].render(variables),
+                description=embed["description"].render(variables),
+                color=embed["color"]
+            )
+            # add author
+            if embed["author"] is not None:
+                name, url, icon_url = embed["author"]
+                discord_embed.set_author(name=name.render(variables), url=url.render(variables), icon_url=icon_url.render(variables))
+            # add fields
+            for name, value, inline in embed["fields"]:
+                discord_embed.add_field(name=name.render(variables), value=value.render(variables), inline=inline)
+            # add thumbnail and image
+            if embed["thumbnail"] is not None:
+                discord_embed.set_thumbnail(url=embed["thumbnail"].render(variables))
+            if embed["image"] is not None:
+                discord_embed.set_image(url=embed["image"].render(variables))
+            # add footer
+            if embed["footer"] is not None:
+                text, icon_url = embed["footer"]
+                discord_embed.set_footer(text=text.render(variables), icon_url=icon_url.render(variables))
+            # add timestamp
+            if embed["timestamp"] is not None:
+                discord_embed.set_footer(text=discord_embed.footer.text, icon_url=discord_embed.footer.icon_url)  # Ensure the footer is set
+                timestamp = time.time() if embed["timestamp"] == "now" else embed["timestamp"]
+                discord_embed.timestamp = datetime.fromtimestamp(timestamp) if timestamp != "none" else None
+            embeds.append(discord_embed)
+        # Add components
+        view = PersistentView(self.components) if self.components is not None else None
+        return {"content": content, "embeds": embeds, "view": view}
+
+
+# Template name -> (file mtime, compiled template, time the mtime was last checked)
+_templates = {}
+# Seconds between two checks of a template file for changes
+RELOAD_INTERVAL = 1.0
+
+
+def get_compiled_template(template_name):
+    """Get a template compiled from templates/<name>.json, reloaded when the file changes"""
+    now = time.monotonic()
+    cached = _templates.get(template_name)
+    if cached is not None and now - cached[2] < RELOAD_INTERVAL:
+        return cached[1]
+
     file_path = f"templates/{template_name}.json"
-    if not os.path.exists(file_path):
+    try:
+        mtime = os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        _templates.pop(template_name, None)
         raise ValueError(f"{template_name} doesn't not exists in messages templates.")
-        
+    if cached is not None and cached[0] == mtime:
+        _templates[template_name] = (mtime, cached[1], now)
+        return cached[1]
+
     template = {}
     with open(file_path, "r", encoding="utf-8") as f:
         template = json.load(f)
@@ -83,72 +237,15 @@ def get_message_from_template(template_name, variables = {}):
     if not template:
         raise ValueError("Message template cannot be empty.")
     
-    return convert_to_message(template, variables)
+    compiled = CompiledTemplate(template)
+    _templates[template_name] = (mtime, compiled, now)
+    return compiled
+
+def get_message_from_template(template_name, variables = {}):
+    return get_compiled_template(template_name).render(variables)
     
 def get_message_from_dict(dictionary, variables = {}):
     return convert_to_message(dictionary, variables)
 
 def convert_to_message(template, variables={}):
-    # define variables
-    content = ""
-    embeds = []
-    # check if there's a text content 
-    if "content" in template and template["content"] is not None:
-        content = template.get("content", " ").format(**variables)
-    # check for embeds 
-    if "embeds" in template and template["embeds"] is not None:
-        for embed in template["embeds"]:
-            discord_embed = discord.Embed(
-                title = content_format(embed.get("title", "")).format(**variables),
-                description = content_format(embed.get("description", "")).format(**variables),
-                color = int(embed.get("color", "#ff4af0").lstrip("#"), 16) if not isinstance(embed.get("color", "#ff4af0"), int) else embed.get("color", "#ff4af0")
-            )
-            # add author
-            if "author" in embed and embed["author"] is not None:
-                discord_embed.set_author(
-                    name = content_format(embed["author"].get("name", "")).format(**variables), 
-                    url = embed["author"].get("url", "").format(**variables), 
-                    icon_url = embed["author"].get("icon_url", "").format(**variables)
-                )
-            # add fields
-            if "fields" in embed and embed["fields"] is not None:
-                for field in embed["fields"]:
-                    discord_embed.add_field(
-                        name=content_format(field.get("name", "")).format(**variables),
-                        value=content_format(field.get("value", "")).format(**variables),
-                        inline=field.get("inline", False)
-                    )
-            # add thumbnail
-            if "thumbnail" in embed and embed["thumbnail"] is not None:
-                thumbnail = embed["thumbnail"]
-                thumbnail_url = thumbnail.get("url", "") if isinstance(thumbnail, dict) else thumbnail
-                discord_embed.set_thumbnail(url=thumbnail_url.format(**variables))
-            # add image 
-            if "image" in embed and embed["image"] is not None:
-                image = embed["image"]
-                image_url = image.get("url", "") if isinstance(image, dict) else image
-                discord_embed.set_image(url=image_url.format(**variables))
-            # add footer
-            if "footer" in embed and embed["footer"] is not None:
-                discord_embed.set_footer(
-                    text=content_format(embed["footer"].get("text", "")).format(**variables), 
-                    icon_url=embed["footer"].get("icon_url", "").format(**variables)
-                )
-            # add timestamp
-            if "timestamp" in embed and embed["timestamp"] is not None:
-                discord_embed.set_footer(text=discord_embed.footer.text, icon_url=discord_embed.footer.icon_url)  # Ensure the footer is set
-                timestamp = embed.get("timestamp", None)
-                if timestamp == "{timestamp}":
-                    timestamp = time.time()
-                if isinstance(timestamp, (int, float)):
-                    discord_embed.timestamp = datetime.fromtimestamp(timestamp)
-                else:
-                    discord_embed.timestamp = None
-            embeds.append(discord_embed)
-        
-        # Add components 
-        view = None
-        if "components" in template and template["components"] is not None:
-            view = PersistentView(template["components"])
-            
-    return {"content": content, "embeds": embeds, "view": view}
\ No newline at end of file
+    return CompiledTemplate(template).render(variables)
@@ -0,0 +1,51 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class Leaderboard:
+    """XP standings of a guild kept sorted for O(log n) rank lookups
+
+    Updates are O(n): they shift the entries of the sorted list. Entries are stored as (-xp, user_id) so the list is ordered from the highest
+    XP down. A user's rank is 1 + the number of users with strictly more XP,
+    the same as the SQL rank of Database.get_user_level.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, int]] = ()):
+        """
+        Args:
+            rows: (user_id, xp) pairs to start with
+        """
+        self._xp: Dict[int, int] = {}
+        for user_id, xp in rows:
+            self._xp[user_id] = xp
+        self._entries: List[Tuple[int, int]] = sorted((-xp, user_id) for user_id, xp in self._xp.items())
+
+    def set(self, user_id: int, xp: int) -> None:
+        """Set (or add) a user's XP"""
+        old_xp = self._xp.get(user_id)
+        if old_xp is not None:
+            if old_xp == xp:
+                return
+            del self._entries[bisect_left(self._entries, (-old_xp, user_id))]
+        self._xp[user_id] = xp
+        insort(self._entries, (-xp, user_id))
+
+    def remove(self, user_id: int) -> None:
+        """Remove a user from the standings"""
+        old_xp = self._xp.pop(user_id, None)
+        if old_xp is not None:
+            del self._entries[bisect_left(self._entries, (-old_xp, user_id))]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Get a user's rank (1 is the highest XP) or None if not ranked"""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        return bisect_left(self._entries, (-xp,)) + 1
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[int, int]]:
+        """Get (user_id, xp) pairs of a page of the standings"""
+        return [(user_id, -neg_xp) for neg_xp, user_id in self._entries[offset:offset + limit]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class MatchCache:
+    """LRU cache of ranked match tiers
+
+    Entries are keyed by (guild id, requester profile signature, partner gender)
+    and tagged with the guild's ProfileStore generation; an entry from an older
+    generation is treated as a miss, so any relevant role change in the guild
+    invalidates every cached ranking of that guild.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, generation: int) -> Optional[Any]:
+        """Get a cached value if it was stored for this generation"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != generation:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, generation: int, value: Any) -> None:
+        """Store a value for a generation, evicting the least recently used entry if full"""
+        self._entries[key] = (generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
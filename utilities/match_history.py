@@ -0,0 +1,85 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Set, Tuple
+from utilities.database import Database
+
+
+class MatchHistory:
+    """Recent matchmaking pairs, cached in memory and written through to the database
+
+    Two exclusions are tracked per guild:
+    - the last `per_user` candidates shown to each requester
+    - the last `recent` candidates shown to anyone
+
+    Requester histories live in a bounded LRU; a requester evicted from it (or
+    never seen since the restart) is reloaded from the indexed table. Rows no
+    exclusion needs anymore are pruned on load and every `prune_every` matches.
+    """
+
+    def __init__(self, db: Database, per_user: int = 5, recent: int = 10, max_users: int = 10000, prune_every: int = 1000):
+        self.db = db
+        self.per_user = per_user
+        self.recent = recent
+        self.max_users = max_users
+        self.prune_every = prune_every
+        self._writes = 0
+        self._users: "OrderedDict[Tuple[int, int], Deque[int]]" = OrderedDict()
+        self._recent: Dict[int, Deque[int]] = {}
+        self._pending: Set[asyncio.Task] = set()
+
+    async def load(self) -> None:
+        """Warm the cache from the most recent matches in the database"""
+        await self.db.ensure_schema()
+        await self.db.prune_matches(self.per_user, self.recent)
+        rows = await self.db.get_recent_matches(self.max_users * self.per_user)
+        for row in reversed(rows):
+            self._remember(row['guild_id'], row['requester_id'], row['candidate_id'])
+
+    def _remember(self, guild_id: int, requester_id: int, candidate_id: int) -> None:
+        key = (guild_id, requester_id)
+        if key not in self._users:
+            self._users[key] = deque(maxlen=self.per_user)
+        self._users[key].append(candidate_id)
+        self._users.move_to_end(key)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        self._recent.setdefault(guild_id, deque(maxlen=self.recent)).append(candidate_id)
+
+    async def excluded(self, guild_id: int, requester_id: int) -> Set[int]:
+        """Get the IDs a requester must not be matched with right now
+
+        Args:
+            guild_id: Discord guild ID
+            requester_id: ID of the user asking for a match
+
+        Returns:
+            Set of member IDs to exclude
+        """
+        key = (guild_id, requester_id)
+        history = self._users.get(key)
+        if history is None:
+            candidates = await self.db.get_user_matches(guild_id, requester_id, self.per_user)
+            history = deque(reversed(candidates), maxlen=self.per_user)
+            self._users[key] = history
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(key)
+        return set(history) | set(self._recent.get(guild_id, ()))
+
+    def record(self, guild_id: int, requester_id: int, candidate_id: int) -> None:
+        """Record a match in memory and schedule its write to the database"""
+        self._remember(guild_id, requester_id, candidate_id)
+        task = asyncio.create_task(self._write(guild_id, requester_id, candidate_id, int(time.time())))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _write(self, guild_id: int, requester_id: int, candidate_id: int, matched_at: int) -> None:
+        try:
+            await self.db.add_match(guild_id, requester_id, candidate_id, matched_at)
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                await self.db.prune_matches(self.per_user, self.recent)
+        except Exception:
+            from errors.error_logger import error_send
+            await error_send()
@@ -0,0 +1,130 @@
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from utilities.match_scoring import ProfileColumns, ProfileEncoder
+
+
+class ProfileStore:
+    """In-memory store of decoded matchmaking profiles, one per guild member.
+
+    Profiles are decoded once when a guild is loaded and then kept in sync from
+    member events, so a match query only iterates precomputed records instead of
+    re-decoding every member's roles. When an encoder is given, the store also
+    keeps per-guild candidate columns keyed by gender, holding only the members
+    that pass the hard filters (see `eligible`), for batch scoring.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[Any], Dict[str, Any]],
+        encoder: Optional[ProfileEncoder] = None,
+        eligible: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ):
+        """Create an empty store
+
+        Args:
+            decode: Callable turning a discord.Member into a profile record
+            encoder: Optional encoder used to maintain per-guild candidate columns
+            eligible: Optional hard filter a profile must pass to be a candidate
+        """
+        self.decode = decode
+        self.encoder = encoder
+        self.eligible = eligible or (lambda profile: True)
+        self._profiles: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._candidates: Dict[int, Dict[str, ProfileColumns]] = {}
+        self._generations: Dict[int, int] = {}
+
+    def is_loaded(self, guild_id: int) -> bool:
+        """Check if a guild's profiles have been loaded"""
+        return guild_id in self._profiles
+
+    def generation(self, guild_id: int) -> int:
+        """Get a counter bumped every time a guild's candidates change"""
+        return self._generations.get(guild_id, 0)
+
+    def _bump(self, guild_id: int) -> None:
+        self._generations[guild_id] = self._generations.get(guild_id, 0) + 1
+
+    def _is_candidate(self, profile: Optional[Dict[str, Any]]) -> bool:
+        return profile is not None and profile['gender'] is not None and self.eligible(profile)
+
+    def load_guild(self, guild) -> None:
+        """Decode the profile of every (non bot) member of a guild
+
+        Args:
+            guild: The discord.Guild to load
+        """
+        self._bump(guild.id)
+        self._profiles[guild.id] = {
+            member.id: self.decode(member)
+            for member in guild.members
+            if not member.bot
+        }
+        if self.encoder is not None:
+            by_gender: Dict[str, list] = {}
+            for member_id, profile in self._profiles[guild.id].items():
+                if self._is_candidate(profile):
+                    by_gender.setdefault(profile['gender'], []).append((member_id, profile))
+            self._candidates[guild.id] = {
+                gender: ProfileColumns.from_profiles(self.encoder, profiles)
+                for gender, profiles in by_gender.items()
+            }
+
+    def unload_guild(self, guild_id: int) -> None:
+        """Forget every profile of a guild"""
+        self._profiles.pop(guild_id, None)
+        self._candidates.pop(guild_id, None)
+        self._bump(guild_id)
+
+    def update(self, member) -> None:
+        """Re-decode a single member's profile
+
+        Args:
+            member: The discord.Member whose roles changed
+        """
+        if member.bot or member.guild.id not in self._profiles:
+            return
+        profile = self.decode(member)
+        previous = self._profiles[member.guild.id].get(member.id)
+        if previous == profile:
+            return
+        self._profiles[member.guild.id][member.id] = profile
+        if not self._is_candidate(previous) and not self._is_candidate(profile):
+            return
+        self._bump(member.guild.id)
+        candidates = self._candidates.get(member.guild.id)
+        if candidates is not None:
+            for columns in candidates.values():
+                columns.remove(member.id)
+            if self._is_candidate(profile):
+                if profile['gender'] not in candidates:
+                    candidates[profile['gender']] = ProfileColumns(self.encoder)
+                candidates[profile['gender']].set(member.id, profile)
+
+    def remove(self, member) -> None:
+        """Drop a member's profile, e.g. when they leave the guild"""
+        guild_profiles = self._profiles.get(member.guild.id)
+        if guild_profiles is None or not self._is_candidate(guild_profiles.pop(member.id, None)):
+            return
+        self._bump(member.guild.id)
+        for columns in self._candidates.get(member.guild.id, {}).values():
+            columns.remove(member.id)
+
+    def get(self, guild_id: int, member_id: int) -> Optional[Dict[str, Any]]:
+        """Get the stored profile of a member or None if unknown"""
+        return self._profiles.get(guild_id, {}).get(member_id)
+
+    def members(self, guild_id: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Iterate over (member_id, profile) pairs of a guild"""
+        return iter(self._profiles.get(guild_id, {}).items())
+
+    def candidates(self, guild_id: int, gender: str) -> ProfileColumns:
+        """Get the columns of the eligible candidates of a gender in a guild
+
+        Requires an encoder; returns empty columns if there are no candidates.
+        """
+        columns = self._candidates.get(guild_id, {}).get(gender)
+        if columns is None:
+            columns = ProfileColumns(self.encoder, capacity=1)
+        return columns
+
+    def __len__(self) -> int:
+        return sum(len(profiles) for profiles in self._profiles.values())
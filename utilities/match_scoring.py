@@ -0,0 +1,391 @@
+import asyncio
+import multiprocessing
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Tuple
+
+
+class ProfileEncoder:
+    """Encode decoded matchmaking profiles into small integers
+
+    Single-choice categories become enum codes (0 means "not set"), ages and
+    heights stay numeric (-1 means "not set") and multi-choice categories
+    (personality, hobbies) are bitmasks, one bit per role name. Profiles
+    decoded by the match cog already hold those bitmasks.
+    """
+
+    # (column name, dtype)
+    COLUMNS = (
+        ('gender', np.int8),
+        ('age', np.int16),
+        ('height', np.int16),
+        ('region', np.int8),
+        ('relationship_status', np.int8),
+        ('dms_status', np.int8),
+        ('height_preference', np.int8),
+        ('age_preference', np.int8),
+        ('distance_preference', np.int8),
+        ('personality', np.int32),
+        ('personality_preference', np.int32),
+        ('hobbies', np.int32),
+    )
+
+    def __init__(self, category_weights: Dict[str, Any], region: Dict[str, int], personality: Dict[str, int]):
+        """Build the code tables from the matchmaking role tables
+
+        Args:
+            category_weights: MatchSySystems.category_weights
+            region: Region name -> role id mapping
+            personality: Personality name -> role id mapping
+        """
+        def enum(names: Iterable[str]) -> Dict[str, int]:
+            return {name: code for code, name in enumerate(names, start=1)}
+
+        def bits(names: Iterable[str]) -> Dict[str, int]:
+            return {name: 1 << bit for bit, name in enumerate(dict.fromkeys(names))}
+
+        roles = {category: data["roles"] for category, data in category_weights.items()}
+        self.enums = {
+            'gender': enum(roles["Gender"]),
+            'region': enum(region),
+            'relationship_status': enum(roles["Relationship Status"]),
+            'dms_status': enum(roles["Dms Status"]),
+            'height_preference': enum(roles["Height Preference"]),
+            'age_preference': enum(roles["Age Preference"]),
+            'distance_preference': enum(roles["Distance Preference"]),
+        }
+        # Personality and personality preference share one bit space so that
+        # overlap is a plain AND, matched by name like compare_users does.
+        personality_bits = bits(list(personality) + list(roles["Personality Preference"]))
+        self.bits = {
+            'personality': personality_bits,
+            'personality_preference': personality_bits,
+            'hobbies': bits(roles["Hobbies and Interests"]),
+        }
+
+    def code(self, field: str, value: Optional[str]) -> int:
+        """Get the enum code of a single-choice value (0 if not set or unknown)"""
+        return self.enums[field].get(value, 0)
+
+    def mask(self, field: str, values: Optional[Iterable[str]]) -> int:
+        """Get the bitmask of multi-choice values (masks are passed through)"""
+        if isinstance(values, int):
+            return values
+        table = self.bits[field]
+        result = 0
+        for value in values or ():
+            result |= table.get(value, 0)
+        return result
+
+    def names(self, field: str, mask: int) -> List[str]:
+        """Get the names set in a multi-choice bitmask"""
+        return [name for name, bit in self.bits[field].items() if mask & bit]
+
+    def encode(self, profile: Dict[str, Any]) -> Tuple[int, ...]:
+        """Encode a profile into a tuple ordered like COLUMNS"""
+        encoded = []
+        for field, _ in self.COLUMNS:
+            value = profile.get(field)
+            if field in self.enums:
+                encoded.append(self.code(field, value))
+            elif field in self.bits:
+                encoded.append(self.mask(field, value))
+            else:
+                encoded.append(-1 if value is None else value)
+        return tuple(encoded)
+
+
+class ProfileColumns:
+    """Column storage (one NumPy array per profile field) for a guild's profiles
+
+    Rows are addressed by member id; removing a row moves the last row into the
+    hole so the live rows always occupy [0, size).
+    """
+
+    def __init__(self, encoder: ProfileEncoder, capacity: int = 256):
+        self.encoder = encoder
+        self.size = 0
+        self.rows: Dict[int, int] = {}
+        self._member_ids = np.zeros(capacity, dtype=np.int64)
+        self._data = {field: np.zeros(capacity, dtype=dtype) for field, dtype in encoder.COLUMNS}
+
+    @classmethod
+    def from_profiles(cls, encoder: ProfileEncoder, profiles: Iterable[Tuple[int, Dict[str, Any]]]) -> "ProfileColumns":
+        """Bulk-build columns from (member_id, profile) pairs"""
+        member_ids = []
+        encoded = []
+        for member_id, profile in profiles:
+            member_ids.append(member_id)
+            encoded.append(encoder.encode(profile))
+
+        columns = cls(encoder, capacity=max(len(member_ids), 256))
+        columns.size = len(member_ids)
+        columns.rows = {member_id: row for row, member_id in enumerate(member_ids)}
+        columns._member_ids[:columns.size] = member_ids
+        if encoded:
+            for index, (field, dtype) in enumerate(encoder.COLUMNS):
+                columns._data[field][:columns.size] = np.fromiter((row[index] for row in encoded), dtype=dtype, count=columns.size)
+        return columns
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self) -> None:
+        capacity = len(self._member_ids) * 2
+        self._member_ids = np.resize(self._member_ids, capacity)
+        self._data = {field: np.resize(array, capacity) for field, array in self._data.items()}
+
+    def set(self, member_id: int, profile: Dict[str, Any]) -> None:
+        """Insert or overwrite the row of a member"""
+        row = self.rows.get(member_id)
+        if row is None:
+            if self.size == len(self._member_ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[member_id] = row
+            self._member_ids[row] = member_id
+        for (field, _), value in zip(self.encoder.COLUMNS, self.encoder.encode(profile)):
+            self._data[field][row] = value
+
+    def remove(self, member_id: int) -> None:
+        """Remove the row of a member if present"""
+        row = self.rows.pop(member_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self._member_ids[last])
+            self._member_ids[row] = moved_id
+            for array in self._data.values():
+                array[row] = array[last]
+            self.rows[moved_id] = row
+        self.size = last
+
+    def snapshot(self) -> "ProfileColumns":
+        """Copy the live rows into compact columns, e.g. to ship to a worker process"""
+        snapshot = ProfileColumns(self.encoder, capacity=max(self.size, 1))
+        snapshot.size = self.size
+        snapshot._member_ids[:self.size] = self.member_ids
+        for field in snapshot._data:
+            snapshot._data[field][:self.size] = self.column(field)
+        return snapshot
+
+    @property
+    def member_ids(self) -> np.ndarray:
+        """Member ids of the live rows"""
+        return self._member_ids[:self.size]
+
+    def column(self, field: str) -> np.ndarray:
+        """Values of a field for the live rows"""
+        return self._data[field][:self.size]
+
+
+class BatchScorer:
+    """Score one requester against every candidate of a ProfileColumns at once
+
+    Produces exactly the scores of MatchSySystems.compare_users, using array
+    operations over the candidate columns instead of a Python call per pair.
+    """
+
+    OVERLAP_CAP = 3
+
+    def __init__(self, category_weights: Dict[str, Any], encoder: ProfileEncoder):
+        self.encoder = encoder
+        self.weights = {category: data["score"] for category, data in category_weights.items()}
+        width = max(len(table) for table in encoder.bits.values())
+        self._popcount = np.array([bin(value).count("1") for value in range(1 << width)], dtype=np.int32)
+
+    def overlap(self, a: int, b: np.ndarray) -> np.ndarray:
+        """Number of shared bits between a mask and each mask of b, clamped to the cap"""
+        return np.minimum(self._popcount[b & a], self.OVERLAP_CAP)
+
+    def score(self, user_data: Dict[str, Any], columns: ProfileColumns) -> np.ndarray:
+        """Score a requester against every row of columns
+
+        Args:
+            user_data: The requester's decoded profile
+            columns: Candidate columns
+
+        Returns:
+            An int32 array of scores aligned with columns.member_ids
+        """
+        enc = self.encoder
+        weights = self.weights
+        col = columns.column
+        scores = np.zeros(len(columns), dtype=np.int32)
+
+        # Dms and relationship status
+        dms = col('dms_status')
+        relationship = col('relationship_status')
+        scores += np.where(dms != 0, weights["Dms Status"], 0).astype(np.int32)
+        scores += np.where(relationship != 0, weights["Relationship Status"], 0).astype(np.int32)
+        excluded = (
+            (dms == enc.code('dms_status', "dms closed"))
+            | (relationship == enc.code('relationship_status', "taken"))
+            | (relationship == enc.code('relationship_status', "not looking"))
+        )
+
+        # Age preference
+        user_age = user_data['age']
+        if user_age is not None:
+            age = col('age')
+            age_pref = col('age_preference')
+            no_pref = enc.code('age_preference', "no preference")
+            preference = user_data['age_preference']
+            matched = None
+            if preference == "older":
+                matched = (age >= 0) & (user_age < age) & ((age_pref == enc.code('age_preference', "younger")) | (age_pref == no_pref))
+            elif preference == "younger":
+                matched = (age >= 0) & (user_age > age) & ((age_pref == enc.code('age_preference', "older")) | (age_pref == no_pref))
+            elif preference == "same age":
+                matched = (age >= 0) & (user_age == age) & ((age_pref == enc.code('age_preference', "same age")) | (age_pref == no_pref))
+            if matched is not None:
+                scores += np.where(matched, weights["Age Preference"], 0).astype(np.int32)
+
+        # Height preference
+        user_height = user_data['height']
+        preference = user_data['height_preference']
+        if user_height is not None and preference is not None:
+            height = col('height')
+            height_pref = col('height_preference')
+            no_pref = enc.code('height_preference', "no preference")
+            known = (height >= 0) & (height_pref != 0)
+            matched = None
+            if preference == "taller":
+                matched = known & (user_height < height) & ((height_pref == enc.code('height_preference', "shorter")) | (height_pref == no_pref))
+            elif preference == "shorter":
+                matched = known & (user_height > height) & ((height_pref == enc.code('height_preference', "taller")) | (height_pref == no_pref))
+            elif preference == "no preference":
+                matched = known & (height_pref == no_pref)
+            if matched is not None:
+                scores += np.where(matched, weights["Height Preference"], 0).astype(np.int32)
+
+        # Distance preference
+        preference = user_data['distance_preference']
+        if preference is not None and user_data['region'] is not None:
+            region = col('region')
+            distance_pref = col('distance_preference')
+            known = (region != 0) & (distance_pref != 0)
+            matched = None
+            if preference == "Local":
+                matched = known & (region == enc.code('region', user_data['region']))
+            elif preference == "Long distance":
+                matched = known & (distance_pref == enc.code('distance_preference', "Long distance"))
+            if matched is not None:
+                scores += np.where(matched, weights["Distance Preference"], 0).astype(np.int32)
+
+        # Personality preference and hobbies overlap
+        scores += self.overlap(enc.mask('personality_preference', user_data['personality_preference']), col('personality')) * weights["Personality Preference"]
+        scores += self.overlap(enc.mask('hobbies', user_data['hobbies']), col('hobbies')) * weights["Hobbies and Interests"]
+
+        scores[excluded] = 0
+        return scores
+
+
+def rank_tiers(scorer: BatchScorer, user_data: Dict[str, Any], columns: ProfileColumns, depth: int) -> List[Tuple[int, List[int]]]:
+    """Score candidates and group the best of them into tiers of equal score
+
+    Scores are small integers, so the cut-off is found with a counting pass
+    instead of sorting: tiers are taken from the top until they hold at least
+    `depth` candidates (or every candidate, for smaller guilds).
+
+    Args:
+        scorer: The scorer to use
+        user_data: The requester's decoded profile
+        columns: Candidate columns
+        depth: Minimum number of candidates the returned tiers should hold
+
+    Returns:
+        List of (score, member_ids) tiers, best first
+    """
+    scores = scorer.score(user_data, columns)
+    if len(scores) == 0:
+        return []
+    counts = np.bincount(scores)
+    threshold = len(counts) - 1
+    total = counts[threshold]
+    while total < depth and threshold > 0:
+        threshold -= 1
+        total += counts[threshold]
+
+    rows = np.flatnonzero(scores >= threshold)
+    row_scores = scores[rows]
+    member_ids = columns.member_ids
+    return [
+        (score, member_ids[rows[row_scores == score]].tolist())
+        for score in range(len(counts) - 1, threshold - 1, -1)
+        if counts[score]
+    ]
+
+
+def pick_from_tiers(tiers: List[Tuple[int, List[int]]], excluded: Collection[int], count: int = 1) -> List[Tuple[int, int]]:
+    """Pick the best candidates from ranked tiers, skipping excluded ones
+
+    Candidates are taken tier by tier; inside a tier they are picked at random,
+    so for count=1 this is a uniform pick among the highest scores.
+
+    Args:
+        tiers: Tiers from rank_tiers
+        excluded: Member IDs that must not be returned
+        count: Number of candidates to pick
+
+    Returns:
+        Up to count (member_id, score) pairs, best first
+    """
+    picked = []
+    for score, member_ids in tiers:
+        needed = count - len(picked)
+        if needed <= 0:
+            break
+        # At most len(excluded) of the sampled IDs can be dropped
+        sample = random.sample(member_ids, min(len(member_ids), needed + len(excluded)))
+        available = [member_id for member_id in sample if member_id not in excluded]
+        picked.extend((member_id, score) for member_id in available[:needed])
+    return picked
+
+
+class ScoringPool:
+    """Run large candidate scans in a worker process
+
+    Scans with fewer candidates than `threshold` run inline; bigger ones are
+    shipped as a pickled ProfileColumns snapshot to a ProcessPoolExecutor so
+    the event loop only awaits the result. Workers are started from a fork
+    server, never forked from the bot process and its database threads.
+    """
+
+    def __init__(self, threshold: Optional[int] = 20000, max_workers: int = 1):
+        """
+        Args:
+            threshold: Minimum number of candidates to use the pool, None to never use it
+            max_workers: Number of worker processes
+        """
+        self.threshold = threshold
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=random.seed
+            )
+        return self._executor
+
+    async def run(self, func: Callable, scorer: BatchScorer, user_data: Dict[str, Any], columns: ProfileColumns, *args) -> Any:
+        """Call func(scorer, user_data, columns, *args), in the pool for large scans
+
+        func must be a module level function so it can be sent to the worker.
+        """
+        if self.threshold is None or len(columns) < self.threshold:
+            return func(scorer, user_data, columns, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, scorer, user_data, columns.snapshot(), *args)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,197 @@
+import asyncio
+import time
+import traceback
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional
+
+import discord
+
+
+class MessageContext:
+    """A message classified once, shared by every handler it is dispatched to"""
+    __slots__ = (
+        "message", "guild", "guild_id", "channel", "channel_id",
+        "author", "author_id", "is_bot", "role_ids", "content", "lower"
+    )
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.guild = message.guild
+        self.guild_id = message.guild.id if message.guild else None
+        self.channel = message.channel
+        self.channel_id = message.channel.id
+        self.author = message.author
+        self.author_id = message.author.id
+        self.is_bot = message.author.bot
+        roles = getattr(message.author, "roles", None) or ()
+        self.role_ids: FrozenSet[int] = frozenset(role.id for role in roles)
+        self.content = message.content
+        self.lower = message.content.lower()
+
+
+def message_handler(
+    *,
+    channels: Optional[Iterable[int]] = None,
+    exact: Optional[Iterable[str]] = None,
+    contains: Optional[Iterable[str]] = None,
+    when: Optional[str] = None,
+    bots: bool = False,
+    guild_only: bool = True
+):
+    """Mark a cog method as a handler of the MessageRouter
+
+    The method is called as `handler(self, ctx)` with a MessageContext, only for
+    messages passing every given filter:
+
+    Args:
+        channels: IDs of the only channels the handler runs in
+        exact: Lowercased message contents that trigger the handler
+        contains: Lowercased substrings, one of which the content must contain
+        when: Name of a cog method `(self, ctx) -> bool` deciding the rest
+        bots: Whether messages of bots (the bot included) are handled
+        guild_only: Whether direct messages are ignored
+    """
+    def decorator(func):
+        func.__message_filter__ = {
+            "channels": frozenset(channels) if channels is not None else None,
+            "exact": frozenset(exact) if exact is not None else None,
+            "contains": tuple(contains) if contains is not None else None,
+            "when": when,
+            "bots": bots,
+            "guild_only": guild_only,
+        }
+        return func
+    return decorator
+
+
+class HandlerStat:
+    """Running latency totals of one handler"""
+    __slots__ = ("count", "total", "max", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+
+class MessageHandler:
+    __slots__ = ("name", "cog", "callback", "channels", "exact", "contains", "when", "bots", "guild_only", "stat")
+
+    def __init__(self, cog, callback: Callable, filters: Dict[str, Any]):
+        self.name = f"{type(cog).__name__}.{callback.__name__}"
+        self.cog = cog
+        self.callback = callback
+        self.channels = filters["channels"]
+        self.exact = filters["exact"]
+        self.contains = filters["contains"]
+        self.when = getattr(cog, filters["when"]) if filters["when"] else None
+        self.bots = filters["bots"]
+        self.guild_only = filters["guild_only"]
+        self.stat = HandlerStat()
+
+    def matches(self, ctx: MessageContext) -> bool:
+        if ctx.is_bot and not self.bots:
+            return False
+        if self.guild_only and ctx.guild is None:
+            return False
+        if self.exact is not None and ctx.lower not in self.exact:
+            return False
+        if self.contains is not None and not any(trigger in ctx.lower for trigger in self.contains):
+            return False
+        if self.when is not None and not self.when(ctx):
+            return False
+        return True
+
+
+class MessageRouter:
+    """Single on_message listener dispatching to the handlers of every cog
+
+    Each message is classified once into a MessageContext, then only handlers
+    whose filters match are run, concurrently, each with its latency recorded.
+    Handlers restricted to channels are indexed by channel ID, so they cost
+    nothing for messages elsewhere. Like Database, every instantiation returns
+    the same router.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, slow_threshold: float = 1.0):
+        """Create the router
+
+        Args:
+            slow_threshold: Seconds after which a handler run is printed as slow
+        """
+        if self._initialized:
+            return
+        self.slow_threshold = slow_threshold
+        self._handlers: List[MessageHandler] = []
+        self._by_channel: Dict[int, List[MessageHandler]] = {}
+        self._anywhere: List[MessageHandler] = []
+        MessageRouter._initialized = True
+
+    def add_cog(self, cog) -> None:
+        """Register every method of a cog decorated with message_handler"""
+        self.remove_cog(cog)
+        for name in dir(type(cog)):
+            func = getattr(type(cog), name, None)
+            filters = getattr(func, "__message_filter__", None)
+            if filters is not None:
+                self._handlers.append(MessageHandler(cog, getattr(cog, name), filters))
+        self._reindex()
+
+    def remove_cog(self, cog) -> None:
+        """Unregister the handlers of a cog"""
+        self._handlers = [handler for handler in self._handlers if handler.cog is not cog]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_channel = {}
+        self._anywhere = []
+        for handler in self._handlers:
+            if handler.channels is None:
+                self._anywhere.append(handler)
+            else:
+                for channel_id in handler.channels:
+                    self._by_channel.setdefault(channel_id, []).append(handler)
+
+    async def dispatch(self, message: discord.Message) -> None:
+        """on_message listener: run the matching handlers of a message"""
+        ctx = MessageContext(message)
+        handlers = self._anywhere + self._by_channel.get(ctx.channel_id, [])
+        matched = [handler for handler in handlers if handler.matches(ctx)]
+        if matched:
+            await asyncio.gather(*(self._run(handler, ctx) for handler in matched))
+
+    async def _run(self, handler: MessageHandler, ctx: MessageContext) -> None:
+        started = time.perf_counter()
+        try:
+            await handler.callback(ctx)
+        except Exception:
+            handler.stat.errors += 1
+            traceback.print_exc()
+        elapsed = time.perf_counter() - started
+        stat = handler.stat
+        stat.count += 1
+        stat.total += elapsed
+        if elapsed > stat.max:
+            stat.max = elapsed
+        if elapsed >= self.slow_threshold:
+            print(f"Slow message handler {handler.name}: {elapsed * 1000:.1f} ms")
+
+    def report(self) -> str:
+        """Format the latency of every handler as a plain text table"""
+        lines = [f"{'calls':>7} {'mean ms':>8} {'max ms':>8} {'errors':>6}  handler"]
+        for handler in sorted(self._handlers, key=lambda h: h.stat.total, reverse=True):
+            stat = handler.stat
+            mean = stat.total / stat.count * 1000 if stat.count else 0.0
+            lines.append(f"{stat.count:>7} {mean:>8.2f} {stat.max * 1000:>8.1f} {stat.errors:>6}  {handler.name}")
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self._handlers)
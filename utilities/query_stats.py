@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+COGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cogs")
+
+
+@lru_cache(maxsize=1024)
+def query_template(query: str) -> str:
+    """Collapse the whitespace of a query so equal statements share one entry"""
+    return " ".join(query.split())
+
+
+def find_caller() -> str:
+    """Name the cog method up the call stack that issued the current query"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(COGS_DIR):
+            name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+            return f"{os.path.basename(filename)}:{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryStat:
+    """Running totals of one query template"""
+    __slots__ = ("count", "lock_wait", "exec_time", "max_time", "rows")
+
+    def __init__(self):
+        self.count = 0
+        self.lock_wait = 0.0
+        self.exec_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+
+
+class QueryStats:
+    """Optional per-template instrumentation of the Database queries
+
+    When enabled, every query adds to its template's count, time spent waiting
+    for a connection (the writer lock or a pooled reader), execution time and
+    rows returned or changed. Queries slower than `slow_threshold` seconds are
+    printed with the cog method that issued them and kept in `slow_queries`.
+    """
+
+    def __init__(self, enabled: bool = False, slow_threshold: float = 0.1, slow_log_size: int = 50):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.since = time.time()
+        self._stats: Dict[str, QueryStat] = {}
+        # (timestamp, seconds, caller, template) of the latest slow queries
+        self.slow_queries: Deque[Tuple[float, float, str, str]] = deque(maxlen=slow_log_size)
+
+    def record(self, query: str, lock_wait: float, exec_time: float, rows: int) -> None:
+        """Add one execution of a query"""
+        if not self.enabled:
+            return
+        template = query_template(query)
+        stat = self._stats.get(template)
+        if stat is None:
+            stat = self._stats[template] = QueryStat()
+        stat.count += 1
+        stat.lock_wait += lock_wait
+        stat.exec_time += exec_time
+        stat.rows += max(rows, 0)
+        if exec_time > stat.max_time:
+            stat.max_time = exec_time
+        if lock_wait + exec_time >= self.slow_threshold:
+            caller = find_caller()
+            self.slow_queries.append((time.time(), lock_wait + exec_time, caller, template))
+            print(f"Slow query ({(lock_wait + exec_time) * 1000:.1f} ms, waited {lock_wait * 1000:.1f} ms) from {caller}: {template}")
+
+    def top(self, limit: int = 10, key: str = "exec_time") -> List[Tuple[str, QueryStat]]:
+        """Get the templates with the highest total of `key` (count, lock_wait, exec_time or rows)"""
+        return sorted(self._stats.items(), key=lambda item: getattr(item[1], key), reverse=True)[:limit]
+
+    def reset(self) -> None:
+        """Forget every recorded query"""
+        self._stats.clear()
+        self.slow_queries.clear()
+        self.since = time.time()
+
+    def report(self, limit: int = 10, key: str = "exec_time", width: Optional[int] = 80) -> str:
+        """Format the top templates as a plain text table"""
+        lines = [f"{'count':>7} {'exec ms':>9} {'wait ms':>9} {'max ms':>8} {'rows':>8}  query"]
+        for template, stat in self.top(limit, key):
+            if width and len(template) > width:
+                template = template[:width - 3] + "..."
+            lines.append(
+                f"{stat.count:>7} {stat.exec_time * 1000:>9.1f} {stat.lock_wait * 1000:>9.1f} "
+                f"{stat.max_time * 1000:>8.1f} {stat.rows:>8}  {template}"
+            )
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self._stats)
@@ -0,0 +1,158 @@
+"""Schema registry of the bot database
+
+Every table and index is declared here once. Database.ensure_schema compares
+SCHEMA_VERSION with the database's `PRAGMA user_version` and only runs DDL and
+migrations when the version was bumped.
+
+To change the schema: edit TABLES/INDEXES, bump SCHEMA_VERSION and, if existing
+data must be transformed, add the steps under the new version in MIGRATIONS.
+"""
+import json
+import os
+
+SCHEMA_VERSION = 5
+
+# Blocking sqlite3 database the moderation and confessions cogs used to write to
+LEGACY_DB_PATH = "database/data.db"
+
+# Table name -> column definitions
+TABLES = {
+    # User levels system
+    "user_levels": """
+        user_id INTEGER,
+        guild_id INTEGER,
+        xp INTEGER DEFAULT 0,
+        level INTEGER DEFAULT 0,
+        last_message TIMESTAMP,
+        PRIMARY KEY (user_id, guild_id)
+    """,
+    "level_settings": """
+        guild_id INTEGER PRIMARY KEY,
+        announcement_channel INTEGER,
+        level_up_message TEXT,
+        is_enabled BOOLEAN DEFAULT 1,
+        xp_blacklist TEXT DEFAULT "[]"
+    """,
+    # Threading system
+    "threading": """
+        guild_id INTEGER PRIMARY KEY,
+        thread_channel TEXT
+    """,
+    # Stick messages system, one row per channel (channel IDs are globally unique)
+    "stick_channels": """
+        channel_id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        last_message_id INTEGER
+    """,
+    # User notification settings
+    "user_settings": """
+        user_id INTEGER PRIMARY KEY,
+        dm_notif TEXT
+    """,
+    # Matchmaking history
+    "match_history": """
+        guild_id INTEGER,
+        requester_id INTEGER,
+        candidate_id INTEGER,
+        matched_at TIMESTAMP
+    """,
+    # Moderation roles
+    "configs": """
+        guild_id INTEGER PRIMARY KEY,
+        jail_role_id INTEGER,
+        sus_role_id INTEGER
+    """,
+    # Anonymous confessions
+    "confessions": """
+        message_id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        content TEXT NOT NULL
+    """,
+}
+
+# Index name -> "table (columns)"
+INDEXES = {
+    "idx_user_levels_guild_xp": "user_levels (guild_id, xp)",
+    "idx_stick_channels_guild": "stick_channels (guild_id)",
+    # Cache warm-up (newest matches first) and per-requester history lookups
+    "idx_match_history_time": "match_history (matched_at)",
+    "idx_match_history_user": "match_history (guild_id, requester_id, matched_at)",
+}
+
+
+
+async def import_legacy_tables(conn) -> None:
+    """Copy the configs and confessions rows of the legacy database, if any"""
+    if not os.path.exists(LEGACY_DB_PATH):
+        return
+    await conn.commit()
+    await conn.execute("ATTACH DATABASE ? AS legacy", (LEGACY_DB_PATH,))
+    try:
+        async with conn.execute("SELECT name FROM legacy.sqlite_master WHERE type = 'table'") as cursor:
+            legacy_tables = {row[0] for row in await cursor.fetchall()}
+        if "configs" in legacy_tables:
+            await conn.execute("""
+                INSERT OR IGNORE INTO configs (guild_id, jail_role_id, sus_role_id)
+                SELECT guild_id, jail_role_id, sus_role_id FROM legacy.configs
+            """)
+        if "confessions" in legacy_tables:
+            await conn.execute("""
+                INSERT OR IGNORE INTO confessions (message_id, user_id, content)
+                SELECT message_id, user_id, content FROM legacy.confessions
+            """)
+        await conn.commit()
+    finally:
+        await conn.execute("DETACH DATABASE legacy")
+
+
+async def split_stick_messages(conn) -> None:
+    """Move the per-guild stick message JSON into one stick_channels row per channel"""
+    async with conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'stick_messages'") as cursor:
+        if await cursor.fetchone() is None:
+            return
+    async with conn.execute("SELECT guild_id, stick_messages FROM stick_messages") as cursor:
+        rows = await cursor.fetchall()
+    # The old JSON could list a channel under several guilds; its real guild
+    # can't be told apart, so the first row seen is kept (INSERT OR IGNORE)
+    channels = []
+    for guild_id, data in rows:
+        for channel_id, stick in (json.loads(data) if data else {}).items():
+            # Rows written before message IDs were tracked only hold the text
+            if isinstance(stick, str):
+                stick = {"content": stick, "message_id": None}
+            if stick.get("content"):
+                channels.append((guild_id, int(channel_id), stick["content"], stick.get("message_id")))
+    await conn.executemany(
+        "INSERT OR IGNORE INTO stick_channels (guild_id, channel_id, content, last_message_id) VALUES (?, ?, ?, ?)",
+        channels
+    )
+    await conn.execute("DROP TABLE stick_messages")
+
+
+async def key_stick_channels_by_channel(conn) -> None:
+    """Rebuild stick_channels keyed by channel_id alone, keeping the first row of each channel"""
+    async with conn.execute("PRAGMA table_info(stick_channels)") as cursor:
+        keys = [row[1] for row in await cursor.fetchall() if row[5]]
+    if keys == ["channel_id"]:
+        return
+    await conn.execute(f"CREATE TABLE stick_channels_new ({TABLES['stick_channels']})")
+    await conn.execute("""
+        INSERT OR IGNORE INTO stick_channels_new (channel_id, guild_id, content, last_message_id)
+        SELECT channel_id, guild_id, content, last_message_id FROM stick_channels ORDER BY rowid
+    """)
+    await conn.execute("DROP TABLE stick_channels")
+    await conn.execute("ALTER TABLE stick_channels_new RENAME TO stick_channels")
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS idx_stick_channels_guild ON {INDEXES['idx_stick_channels_guild']}")
+
+
+# Version -> steps upgrading the previous version's data, run after the tables
+# and indexes above exist. A step is either an SQL statement or an async
+# callable taking the writer connection.
+MIGRATIONS = {
+    1: [],
+    2: [import_legacy_tables],
+    3: [split_stick_messages],
+    4: ["DROP INDEX IF EXISTS idx_match_history_pair"],
+    5: [key_stick_channels_by_channel],
+}
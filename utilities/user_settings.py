@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+from typing import Tuple
+from utilities.database import Database
+
+
+class UserSettings:
+    """Per-user notification settings, read through a bounded LRU/TTL cache
+
+    Users without a row are cached too (as the default), so message-rate lookups
+    almost never reach the database. Changes are written to the database first
+    and then to the cache. Like Database, every instantiation returns the same
+    object, so all views and cogs share one cache.
+    """
+
+    _instance = None
+    _initialized = False
+
+    DEFAULT_DM_NOTIF = "enabled"
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, db: Database = None, max_entries: int = 10000, ttl: float = 600.0):
+        """Create the settings cache
+
+        Args:
+            db: Database holding the user_settings table
+            max_entries: Number of users kept in memory
+            ttl: Seconds before a cached value is read again from the database
+        """
+        if self._initialized:
+            return
+        self.db = db or Database()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._dm_notif: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        UserSettings._initialized = True
+
+    def _remember(self, user_id: int, value: str) -> None:
+        self._dm_notif[user_id] = (time.monotonic() + self.ttl, value)
+        self._dm_notif.move_to_end(user_id)
+        while len(self._dm_notif) > self.max_entries:
+            self._dm_notif.popitem(last=False)
+
+    async def get_dm_notif(self, user_id: int) -> str:
+        """Get a user's DM notification setting ("enabled" or "disabled")"""
+        entry = self._dm_notif.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._dm_notif.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = await self.db.fetchvalue(
+            "SELECT dm_notif FROM user_settings WHERE user_id = ?",
+            (user_id,)
+        ) or self.DEFAULT_DM_NOTIF
+        self._remember(user_id, value)
+        return value
+
+    async def set_dm_notif(self, user_id: int, value: str) -> None:
+        """Store a user's DM notification setting, then update the cache"""
+        # Batched with other writes; wait until it's committed
+        await self.db.queue_write(
+            "INSERT OR REPLACE INTO user_settings (user_id, dm_notif) VALUES (?, ?)",
+            (user_id, value)
+        )
+        self._remember(user_id, value)
+
+    def __len__(self) -> int:
+        return len(self._dm_notif)